@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'run_at', 'attempts', 'failed',
+                    'locked_by')
+    list_filter = ('failed', 'name')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Регистрирует задачу отправки почты и в процессе воркера.
+        from . import db, mail  # noqa: F401
@@ -0,0 +1,161 @@
+"""ASGI-обработчик для Django 2.2, в которой своего ещё нет.
+
+Соединения, чтение тела запроса и отправку готового ответа ведёт цикл
+событий, а сам Django выполняется в пуле из ASGI_THREADS потоков через
+обычный WSGIHandler. Медленный клиент занимает только сокет, а не поток:
+поток освобождается, как только view вернул ответ. Потоковые ответы
+(StreamingHttpResponse) итерируются в том же потоке, что их создал, —
+генератор может держать курсор базы этого потока.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+from core.settings import ASGI_THREADS
+
+
+class ASGIHandler:
+
+    def __init__(self, threads=ASGI_THREADS):
+        self.wsgi_handler = WSGIHandler()
+        self.executor = ThreadPoolExecutor(threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                self.executor, self.respond,
+                self.environ(scope, body), loop, send,
+            )
+        finally:
+            body.close()
+        if response is not None:
+            start, content = response
+            await send(start)
+            await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """Тело запроса; None, если клиент ушёл, не дослав его.
+
+        Большое тело уходит на диск, как и загрузки в Django.
+        """
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        # WSGI передаёт путь байтами в latin-1, Django сам декодирует UTF-8.
+        path = scope['path'].encode().decode('latin-1')
+        root_path = scope.get('root_path', '').encode().decode('latin-1')
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path,
+            'PATH_INFO': path[len(root_path):]
+            if path.startswith(root_path) else path,
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        # Тело уже прочитано целиком, его длина известна и без заголовка,
+        # например при chunked-передаче.
+        environ['CONTENT_LENGTH'] = str(body.seek(0, 2))
+        body.seek(0)
+        return environ
+
+    def respond(self, environ, loop, send):
+        """Выполняется в потоке пула.
+
+        Обычный ответ возвращается целиком и отправляется уже из цикла
+        событий; потоковый отправляется отсюда по частям.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started.append({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            })
+
+        response = self.wsgi_handler(environ, start_response)
+        try:
+            if not response.streaming:
+                return started[0], response.content
+
+            def send_now(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_now(started[0])
+            for chunk in response:
+                if chunk:
+                    send_now({'type': 'http.response.body', 'body': chunk,
+                              'more_body': True})
+            send_now({'type': 'http.response.body', 'body': b''})
+            return None
+        finally:
+            # Шлёт request_finished: соединения с базой этого потока
+            # закрываются по CONN_MAX_AGE, как и под WSGI.
+            response.close()
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,55 @@
+"""Настройка SQLite для работы под нагрузкой.
+
+PRAGMA выполняются при каждом новом соединении; вместе с CONN_MAX_AGE
+это случается раз в несколько минут, а не на каждый запрос.
+busy_timeout заставляет ждать блокировку, но не спасает транзакцию,
+которая сначала читала, а потом пишет: SQLite сразу отвечает ей
+«database is locked», чтобы не было взаимной блокировки. Такую
+транзакцию retry_locked повторяет целиком после короткой паузы.
+"""
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.settings import (
+    SQLITE_LOCKED_DELAY, SQLITE_LOCKED_RETRIES, SQLITE_PRAGMAS
+)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS:
+            # У базы в памяти нет журнала, WAL ей не нужен.
+            if name == 'journal_mode' and connection.is_in_memory_db():
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_locked(func):
+    """Повторяет функцию, если SQLite ответил «database is locked».
+
+    Повтор возможен только вне внешней транзакции: внутри неё откат
+    сделает вызывающий код, поэтому ошибка пробрасывается дальше.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(SQLITE_LOCKED_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if (not is_locked(error) or connection.in_atomic_block
+                        or attempt == SQLITE_LOCKED_RETRIES):
+                    raise
+            time.sleep(SQLITE_LOCKED_DELAY * 2 ** attempt)
+    return wrapper
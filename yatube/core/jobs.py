@@ -0,0 +1,177 @@
+"""Фоновые задачи в очереди на таблице базы, без внешнего брокера.
+
+Задача ставится в очередь той же транзакцией, что и изменение данных,
+поэтому воркер увидит её только после коммита, а при откате её не будет.
+Воркер (manage.py run_worker) забирает задачи пачкой, помечая их своим
+именем; задачи с batch=True получают всю пачку одним вызовом. Упавшая
+задача повторяется с удваивающейся задержкой, а после JOB_MAX_ATTEMPTS
+неудач остаётся в таблице с failed=True и текстом ошибки.
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import Job
+from core.settings import (
+    JOB_BATCH_SIZE, JOB_LOCK_TIMEOUT, JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY
+)
+
+TASKS = {}
+
+
+class PartialFailure(Exception):
+    """Пакетная задача выполнила не всё: повторить только failed.
+
+    failed — позиции неудавшихся payload в пачке; остальные задачи пачки
+    считаются выполненными, и их изменения в базе коммитятся. Поэтому
+    для failed задача не должна оставлять в базе ничего.
+    """
+
+    def __init__(self, failed, error):
+        super().__init__(error)
+        self.failed = set(failed)
+
+
+def task(name=None, batch=False):
+    """Регистрирует функцию как задачу; func.delay(**payload) ставит её.
+
+    Задача с batch=True вызывается со списком payload всех задач пачки.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        TASKS[task_name] = (func, batch)
+        func.task_name = task_name
+        func.delay = lambda **payload: enqueue(task_name, **payload)
+        return func
+    return decorator
+
+
+def enqueue(task_name, run_at=None, **payload):
+    if task_name not in TASKS:
+        raise LookupError(f'Неизвестная задача: {task_name}')
+    return Job.objects.create(
+        name=task_name,
+        payload=json.dumps(payload, cls=DjangoJSONEncoder),
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim(worker, limit=JOB_BATCH_SIZE):
+    """Забирает до limit готовых задач, которые не держит другой воркер."""
+    now = timezone.now()
+    ready = Job.objects.filter(failed=False, run_at__lte=now).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    )
+    ids = list(ready.values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    # Повторная проверка условий в UPDATE не даёт двум воркерам забрать
+    # одну задачу: второй UPDATE её уже не найдёт.
+    ready.filter(id__in=ids).update(
+        locked_by=worker,
+        locked_until=now + timedelta(seconds=JOB_LOCK_TIMEOUT),
+    )
+    return list(Job.objects.filter(id__in=ids, locked_by=worker))
+
+
+def retry(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.error = error
+        job.locked_by = ''
+        job.locked_until = None
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.failed = True
+        else:
+            job.run_at = now + timedelta(
+                seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        job.save(update_fields=('attempts', 'error', 'locked_by',
+                                'locked_until', 'failed', 'run_at'))
+
+
+def execute(jobs, call):
+    failure = None
+    try:
+        with transaction.atomic():
+            try:
+                call()
+            except PartialFailure as error:
+                # Исключение не выходит из atomic: работа удавшихся задач
+                # пачки коммитится, иначе их удалили бы из очереди вместе
+                # с откаченными изменениями.
+                failure = error
+    except Exception:
+        retry(jobs, traceback.format_exc())
+        return
+    if failure is None:
+        Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+        return
+    failed = [job for index, job in enumerate(jobs)
+              if index in failure.failed]
+    retry(failed, str(failure))
+    Job.objects.filter(
+        id__in=[job.id for job in jobs if job not in failed]
+    ).delete()
+
+
+def run_pending(worker=None, limit=JOB_BATCH_SIZE):
+    """Выполняет одну пачку задач и возвращает её размер."""
+    jobs = claim(worker or worker_name(), limit)
+    by_name = defaultdict(list)
+    for job in jobs:
+        by_name[job.name].append(job)
+    for name, group in by_name.items():
+        if name not in TASKS:
+            retry(group, f'Неизвестная задача: {name}')
+            continue
+        func, batch = TASKS[name]
+        if batch:
+            payloads = [json.loads(job.payload) for job in group]
+            execute(group, lambda: func(payloads))
+        else:
+            for job in group:
+                execute([job], lambda: func(**json.loads(job.payload)))
+    return len(jobs)
+
+
+def work_off(worker=None, limit=JOB_BATCH_SIZE):
+    """Выполняет задачи, пока готовые не кончатся; для тестов и --once."""
+    done = 0
+    while True:
+        processed = run_pending(worker, limit)
+        if not processed:
+            return done
+        done += processed
+
+
+def queue_metrics():
+    """Размер очереди по задачам в формате Prometheus, из таблицы задач."""
+    lines = [
+        '# HELP yatube_jobs Задач в очереди по состоянию: queued, failed',
+        '# TYPE yatube_jobs gauge',
+    ]
+    rows = Job.objects.order_by('name', 'failed').values(
+        'name', 'failed'
+    ).annotate(total=Count('id'))
+    for row in rows:
+        state = 'failed' if row['failed'] else 'queued'
+        lines.append(
+            f'yatube_jobs{{task="{row["name"]}",state="{state}"}} '
+            f'{row["total"]}'
+        )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,109 @@
+"""Отправка почты через очередь фоновых задач.
+
+QueuedEmailBackend лишь ставит письма в очередь, одной вставкой на
+письмо, поэтому веб-воркер не ждёт SMTP даже при лавине сбросов пароля.
+Воркер (run_worker) отправляет письма пачками через одно соединение
+EMAIL_DELIVERY_BACKEND; письмо, которое сервер не принял, повторяется
+отдельно, не задерживая остальные письма пачки.
+"""
+import base64
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.jobs import PartialFailure, task
+from core.metrics import registry
+
+DEFAULT_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+def serialize(message):
+    """Письмо в виде, пригодном для JSON в таблице задач."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError('Вложения MIMEBase в очередь не ставятся')
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            (filename, base64.b64encode(content).decode(), mimetype)
+        )
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+        'content_subtype': message.content_subtype,
+    }
+
+
+def deserialize(data, connection=None):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """EMAIL_BACKEND, который откладывает отправку до воркера."""
+
+    def send_messages(self, email_messages):
+        queued = 0
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            try:
+                deliver_mail.delay(message=serialize(message))
+            except Exception:
+                if not self.fail_silently:
+                    raise
+            else:
+                queued += 1
+        registry.inc('mail_messages_total', queued, status='queued')
+        return queued
+
+
+@task(batch=True)
+def deliver_mail(payloads):
+    messages = [deserialize(payload['message']) for payload in payloads]
+    backend = getattr(settings, 'EMAIL_DELIVERY_BACKEND',
+                      DEFAULT_DELIVERY_BACKEND)
+    failed, error = [], None
+    started = time.perf_counter()
+    # Одна SMTP-сессия на всю пачку; если сервер недоступен, исключение
+    # из open() вернёт в очередь всю пачку.
+    with get_connection(backend) as connection:
+        for index, message in enumerate(messages):
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                failed.append(index)
+                error = exc
+    registry.inc('mail_batches_total')
+    registry.inc('mail_send_seconds_total', time.perf_counter() - started)
+    registry.inc('mail_messages_total', len(messages) - len(failed),
+                 status='sent')
+    if failed:
+        registry.inc('mail_messages_total', len(failed), status='failed')
+        raise PartialFailure(failed, repr(error))
@@ -0,0 +1,55 @@
+import math
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.db import retry_locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии пачками по --batch-size: каждая пачка — '
+        'короткая транзакция, и запись на сайте не ждёт одного большого '
+        'DELETE, как у clearsessions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=900,
+                            help='Не больше лимита параметров запроса '
+                                 '(999 у SQLite), иначе урезается до него.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Пауза между пачками в секундах.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должно быть не меньше 1')
+        # Ключи пачки уходят в IN (...) отдельными параметрами.
+        size = min(options['batch_size'],
+                   connection.features.max_query_params or math.inf)
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            raise CommandError(
+                f'{settings.SESSION_ENGINE} не хранит сессии в базе'
+            )
+        self.sessions = store.get_model_class().objects
+        deleted = 0
+        while True:
+            batch = self.delete_batch(size)
+            if not batch:
+                break
+            deleted += batch
+            time.sleep(options['sleep'])
+        self.stdout.write(f'Удалено сессий: {deleted}')
+
+    @retry_locked
+    def delete_batch(self, size):
+        # Ключи по индексу expire_date: удаление идёт по первичному ключу.
+        with transaction.atomic():
+            keys = list(self.sessions.filter(
+                expire_date__lt=timezone.now()
+            ).values_list('session_key', flat=True)[:size])
+            return self.sessions.filter(session_key__in=keys).delete()[0]
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import run_pending, worker_name
+from core.metrics import registry
+from core.routers import use_primary
+from core.settings import JOB_BATCH_SIZE, JOB_POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда готовые задачи кончатся.')
+        parser.add_argument('--batch', type=int, default=JOB_BATCH_SIZE,
+                            help='Сколько задач забирать за раз.')
+        parser.add_argument('--sleep', type=float, default=JOB_POLL_INTERVAL,
+                            help='Пауза между проверками пустой очереди.')
+        parser.add_argument('--metrics-file',
+                            help='Куда писать метрики воркера для сборщика '
+                                 'textfile (формат Prometheus).')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        done = 0
+        try:
+            # Задачи читают то, что только что записал веб, — не с реплик.
+            with use_primary():
+                while True:
+                    close_old_connections()
+                    processed = run_pending(worker, options['batch'])
+                    done += processed
+                    if processed and options['metrics_file']:
+                        self.write_metrics(options['metrics_file'])
+                    if not processed:
+                        if options['once']:
+                            break
+                        time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Выполнено задач: {done}')
+
+    def write_metrics(self, path):
+        # Через временный файл, чтобы сборщик не прочитал его наполовину.
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            file.write(registry.render())
+        os.replace(temporary, path)
@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS '
+        'онлайн-бэкапом, не останавливая запись.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Копировать умеем только SQLite')
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.close()
+            source = sqlite3.connect(primary['NAME'])
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f'{alias}: {replica.settings_dict["NAME"]}')
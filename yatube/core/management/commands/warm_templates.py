@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны из DIRS, как это делает процесс сервера при '
+        'старте, и падает, если какой-то шаблон не разбирается.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        warmed, errors = warm_templates()
+        self.stdout.write(
+            f'Шаблонов: {warmed} за '
+            f'{(time.perf_counter() - started) * 1000:.1f} мс'
+        )
+        if errors:
+            raise CommandError('\n'.join(
+                f'{name}: {error}' for name, error in errors.items()
+            ))
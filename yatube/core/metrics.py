@@ -0,0 +1,144 @@
+"""Гистограммы времени ответа, SQL и шаблонов в памяти процесса.
+
+Счётчики живут в процессе и обнуляются при его перезапуске; каждый
+воркер отдаёт свои значения, сводить их — забота сборщика метрик.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+METRICS = (
+    ('request_seconds', 'Время обработки запроса', SECONDS_BUCKETS),
+    ('sql_queries', 'SQL-запросов на запрос', QUERIES_BUCKETS),
+    ('sql_seconds', 'Время SQL на запрос', SECONDS_BUCKETS),
+    ('template_seconds', 'Время рендера шаблонов на запрос', SECONDS_BUCKETS),
+)
+
+# Счётчики с метками: имя, описание.
+COUNTERS = (
+    ('mail_messages_total', 'Писем по исходу: queued, sent, failed'),
+    ('mail_batches_total', 'Пачек писем, отправленных одним соединением'),
+    ('mail_send_seconds_total', 'Время отправки пачек писем'),
+)
+
+_local = threading.local()
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestStats:
+    """Что набрал один запрос: SQL и шаблоны."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0
+        self.template_seconds = 0
+
+    def count_query(self, execute, sql, params, many, context):
+        """execute_wrapper, считающий запросы и их время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_seconds += time.perf_counter() - started
+
+    def add(self, other):
+        self.queries += other.queries
+        self.sql_seconds += other.sql_seconds
+        self.template_seconds += other.template_seconds
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(dict)
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[name][tuple(sorted(labels.items()))] += value
+
+    def observe(self, view, seconds, stats):
+        values = (seconds, stats.queries, stats.sql_seconds,
+                  stats.template_seconds)
+        with self.lock:
+            for (name, _, buckets), value in zip(METRICS, values):
+                histogram = self.histograms[name].get(view)
+                if histogram is None:
+                    histogram = self.histograms[name][view] = Histogram(
+                        buckets
+                    )
+                histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        lines = []
+        with self.lock:
+            for name, help_text, _ in METRICS:
+                metric = f'yatube_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histogram in sorted(self.histograms[name].items()):
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{metric}_bucket{{view="{view}",le="{bound}"}} '
+                            f'{total}'
+                        )
+                    lines.append(
+                        f'{metric}_sum{{view="{view}"}} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{metric}_count{{view="{view}"}} {histogram.count}'
+                    )
+            for name, help_text in COUNTERS:
+                metric = f'yatube_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for labels, value in sorted(self.counters[name].items()):
+                    labels = ','.join(f'{key}="{label}"'
+                                      for key, label in labels)
+                    lines.append(f'{metric}{{{labels}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def current_stats():
+    """Статистика запроса, который обрабатывает этот поток, или None."""
+    return getattr(_local, 'stats', None)
+
+
+def set_current_stats(stats):
+    _local.stats = stats
@@ -0,0 +1,105 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.urls import reverse
+
+from core import routers
+from core.metrics import RequestStats, registry, set_current_stats
+from core.settings import REPLICA_PIN_COOKIE, REPLICA_PIN_SECONDS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+@contextmanager
+def counting(stats):
+    """Запросы к БД в этом потоке внутри блока идут в stats."""
+    set_current_stats(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(stats.count_query)
+                )
+            yield
+    finally:
+        set_current_stats(None)
+
+
+class MetricsMiddleware:
+    """Снимает время ответа, SQL и рендер шаблонов по имени view.
+
+    Запросы к БД считаются через execute_wrapper, так что DEBUG для этого
+    не нужен, а накладные расходы — пара вызовов perf_counter на запрос.
+    Тело StreamingHttpResponse читает базу уже после выхода из view,
+    поэтому его куски тоже собираются под счётчиком, а замер пишется,
+    когда поток закончен или оборван.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        started = time.perf_counter()
+        with counting(stats):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, stats, started
+            )
+        else:
+            self.observe(request, stats, started)
+        return response
+
+    def stream(self, content, request, stats, started):
+        chunks = iter(content)
+        try:
+            while True:
+                # Счётчик снимается между кусками: сервер может отдавать
+                # их из другого потока.
+                with counting(stats):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.observe(request, stats, started)
+
+    @staticmethod
+    def observe(request, stats, started):
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else 'unresolved',
+            time.perf_counter() - started,
+            stats,
+        )
+
+
+class ReadYourWritesMiddleware:
+    """Держит посетителя на основной базе, пока реплики догоняют его запись.
+
+    Небезопасные методы и админка всегда идут в основную базу. Если
+    запрос что-то записал, кука на REPLICA_PIN_SECONDS направляет туда же
+    и следующие запросы, например редирект на профиль после post_create.
+    Стоит до SessionMiddleware, чтобы видеть и запись сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset(pinned=(
+            request.method not in SAFE_METHODS
+            or REPLICA_PIN_COOKIE in request.COOKIES
+            or request.path.startswith(reverse('admin:index'))
+        ))
+        try:
+            response = self.get_response(request)
+            if routers.has_written():
+                response.set_cookie(REPLICA_PIN_COOKIE, '1',
+                                    max_age=REPLICA_PIN_SECONDS,
+                                    httponly=True, samesite='Lax')
+        finally:
+            routers.reset()
+        return response
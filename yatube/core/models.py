@@ -0,0 +1,44 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача фоновой очереди; выполненные задачи удаляются."""
+    name = models.CharField(verbose_name='Задача', max_length=200)
+    payload = models.TextField(verbose_name='Аргументы (JSON)', default='{}')
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    locked_by = models.CharField(
+        verbose_name='Воркер',
+        max_length=200,
+        blank=True
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до',
+        null=True,
+        blank=True
+    )
+    failed = models.BooleanField(verbose_name='Провалена', default=False)
+    error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Дата постановки',
+        auto_now_add=True
+    )
+
+    class Meta():
+        ordering = ('run_at', 'id')
+        indexes = (
+            models.Index(fields=('failed', 'run_at', 'id'),
+                         name='job_queue_idx'),
+        )
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
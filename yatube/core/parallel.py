@@ -0,0 +1,82 @@
+"""Независимые запросы к базе внутри одного view — одновременно.
+
+Асинхронных view в Django 2.2 нет, поэтому запросы перекрываются в пуле
+потоков, и у каждого потока своё соединение с базой. Внутри открытой
+транзакции всё выполняется по очереди: другие соединения не видят её
+незакоммиченных строк. Запросы потоков пула попадают в метрики запроса,
+а закрепление за основной базой (core.routers) переходит к ним и
+обратно: запись в потоке пула закрепляет весь запрос.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.db import close_old_connections, connections
+
+from core import routers
+from core.metrics import RequestStats, current_stats
+from core.settings import PARALLEL_QUERY_THREADS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(PARALLEL_QUERY_THREADS,
+                                           thread_name_prefix='query')
+    return _executor
+
+
+def _call(function, pinned):
+    """Выполняется в потоке пула; исключение возвращается, а не бросается.
+
+    Кроме результата возвращает, писал ли поток в основную базу.
+    """
+    stats = RequestStats()
+    routers.reset(pinned)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats.count_query))
+        try:
+            return function(), None, stats, routers.has_written()
+        except Exception as error:
+            return None, error, stats, routers.has_written()
+        finally:
+            # Поток пула обслуживает разные запросы.
+            routers.reset()
+            # Сигналов начала и конца запроса в пуле нет: соединения
+            # с истёкшим CONN_MAX_AGE закрываем сами.
+            close_old_connections()
+
+
+def gather(*functions):
+    """Вызывает функции одновременно и возвращает их результаты по порядку.
+
+    Первая выполняется в текущем потоке, остальные — в пуле. Исключение
+    первой по порядку упавшей функции пробрасывается, например Http404
+    из get_object_or_404.
+    """
+    if (not PARALLEL_QUERY_THREADS or len(functions) < 2
+            or any(connection.in_atomic_block
+                   for connection in connections.all())):
+        return [function() for function in functions]
+    futures = [
+        executor().submit(_call, function, routers.is_pinned())
+        for function in functions[1:]
+    ]
+    results = [functions[0]()]
+    stats = current_stats()
+    for future in futures:
+        result, error, task_stats, wrote = future.result()
+        if stats is not None:
+            stats.add(task_stats)
+        if wrote:
+            # Иначе ReadYourWritesMiddleware не поставит куку.
+            routers.mark_written()
+        if error is not None:
+            raise error
+        results.append(result)
+    return results
@@ -0,0 +1,73 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики — алиасы DATABASES из DATABASE_REPLICAS, например копии SQLite,
+которые обновляет manage.py sync_replicas. Чтение уходит на случайную
+реплику, а в основную базу — когда реплика может не знать о только что
+сделанной записи: после записи в этом же потоке, внутри открытой
+транзакции основной базы и в окне REPLICA_PIN_SECONDS после записи того
+же посетителя (кука ReadYourWritesMiddleware).
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+_local = threading.local()
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', False)
+
+
+def has_written():
+    return getattr(_local, 'wrote', False)
+
+
+def reset(pinned=False):
+    _local.pinned = pinned
+    _local.wrote = False
+
+
+def mark_written():
+    """Запись в основную базу: дальше читаем только из неё."""
+    _local.pinned = _local.wrote = True
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока — из основной базы."""
+    previous = is_pinned()
+    _local.pinned = True
+    try:
+        yield
+    finally:
+        _local.pinned = previous
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (not replicas() or is_pinned()
+                or connections[PRIMARY].in_atomic_block):
+            return PRIMARY
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        mark_written()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными из основной базы.
+        return db == PRIMARY
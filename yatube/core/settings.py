@@ -0,0 +1,39 @@
+# Очередь фоновых задач (core.jobs).
+# Сколько задач воркер забирает за один заход.
+JOB_BATCH_SIZE = 100
+# После стольких неудач задача остаётся в очереди помеченной failed.
+JOB_MAX_ATTEMPTS = 5
+# Задержка перед повтором в секундах; удваивается с каждой попыткой.
+JOB_RETRY_DELAY = 10
+# Через сколько секунд задачи упавшего воркера снова можно забрать.
+JOB_LOCK_TIMEOUT = 300
+# Пауза воркера между проверками пустой очереди.
+JOB_POLL_INTERVAL = 1
+
+# PRAGMA для каждого нового соединения с SQLite (core.db).
+SQLITE_PRAGMAS = (
+    # Читатели не ждут писателя, а писатель — читателей.
+    ('journal_mode', 'WAL'),
+    # В WAL это безопасно: при сбое питания теряется лишь последняя
+    # транзакция, но база не портится.
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    # Отрицательное значение — размер кеша страниц в КиБ.
+    ('cache_size', -64000),
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+)
+# Повторы транзакции записи, упавшей на «database is locked».
+SQLITE_LOCKED_RETRIES = 3
+SQLITE_LOCKED_DELAY = 0.05
+
+# Сколько секунд после записи посетитель читает из основной базы, а не
+# с реплик, которые могли ещё не догнать его запись.
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Потоки ASGI-обработчика (core.asgi), в которых выполняются view.
+ASGI_THREADS = 16
+# Потоки для независимых запросов к базе внутри одного view
+# (core.parallel.gather); 0 — выполнять их по очереди.
+PARALLEL_QUERY_THREADS = 4
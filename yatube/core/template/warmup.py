@@ -0,0 +1,42 @@
+"""Разбор шаблонов проекта заранее, при старте процесса.
+
+С кешированным загрузчиком шаблон разбирается при первом обращении, и
+за это платит первый запрос к каждой странице. warm_templates разбирает
+всё из DIRS движков сразу; шаблоны приложений (админка) остаются
+ленивыми, к ним обращаются редко.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.'):
+                path = os.path.relpath(os.path.join(root, name), directory)
+                yield path.replace(os.sep, '/')
+
+
+def warm_templates():
+    """Загружает шаблоны из DIRS; возвращает число шаблонов и ошибки.
+
+    Ошибка в одном шаблоне не мешает остальным: она попадёт в лог, а
+    сам шаблон упадёт при запросе, как и без прогрева.
+    """
+    warmed, errors = 0, {}
+    for engine in engines.all():
+        for directory in getattr(engine, 'engine', engine).dirs:
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    logger.error('Шаблон %s не разобран: %s', name, error)
+                    errors[name] = error
+                else:
+                    warmed += 1
+    return warmed, errors
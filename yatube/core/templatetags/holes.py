@@ -0,0 +1,43 @@
+from django import template
+from django.template.base import token_kwargs
+
+from core.holes import punch
+
+register = template.Library()
+
+
+class HoleNode(template.Node):
+
+    def __init__(self, template_name, values):
+        self.template_name = template_name
+        self.values = values
+
+    def render(self, context):
+        name = self.template_name.resolve(context)
+        values = {
+            key: value.resolve(context) for key, value in self.values.items()
+        }
+        if getattr(context.get('request'), 'punch_holes', False):
+            return punch(name, values)
+        with context.push(**values):
+            return context.template.engine.get_template(name).render(context)
+
+
+@register.tag
+def hole(parser, token):
+    """Вставляет персональный фрагмент: {% hole 'name.html' key=value %}.
+
+    На кешируемой странице вместо фрагмента остаётся метка, которую
+    заполняет core.holes.fill_holes; значения должны сводиться к JSON.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя шаблона'
+        )
+    values = token_kwargs(bits[2:], parser)
+    if len(values) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает только аргументы вида key=value'
+        )
+    return HoleNode(parser.compile_filter(bits[1]), values)
@@ -0,0 +1,19 @@
+"""Коллбэки transaction.on_commit в тестах внутри транзакции TestCase."""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def on_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет on_commit, зарегистрированные в блоке, при выходе из него.
+
+    TestCase не коммитит транзакцию теста, и без этого коллбэки не
+    выполнились бы вовсе (captureOnCommitCallbacks появился в Django 3.2).
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        _, callback = connection.run_on_commit.pop(start)
+        callback()
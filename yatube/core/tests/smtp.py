@@ -0,0 +1,92 @@
+"""Минимальный SMTP-сервер в потоке для тестов отправки почты."""
+import socketserver
+import threading
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 localhost test SMTP')
+        self.sender, self.recipients = None, []
+        for line in self.rfile:
+            command = line.decode().strip()
+            verb = command[:4].lower()
+            handler = getattr(self, f'smtp_{verb}', None)
+            if handler is None:
+                self.reply('502 Command not implemented')
+            elif handler(command) is False:
+                return
+
+    def smtp_helo(self, command):
+        self.reply('250 localhost')
+
+    smtp_ehlo = smtp_noop = smtp_helo
+
+    def address(self, command):
+        return command.split(':', 1)[1].strip().strip('<>')
+
+    def smtp_mail(self, command):
+        self.sender, self.recipients = self.address(command), []
+        self.reply('250 OK')
+
+    def smtp_rcpt(self, command):
+        address = self.address(command)
+        if address in self.server.refused:
+            self.reply('550 No such user')
+        else:
+            self.recipients.append(address)
+            self.reply('250 OK')
+
+    def smtp_data(self, command):
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        data = []
+        for raw in self.rfile:
+            if raw == b'.\r\n':
+                break
+            data.append(raw[1:] if raw.startswith(b'..') else raw)
+        with self.server.lock:
+            self.server.messages.append(
+                (self.sender, self.recipients, b''.join(data))
+            )
+        self.reply('250 OK')
+
+    def smtp_rset(self, command):
+        self.sender, self.recipients = None, []
+        self.reply('250 OK')
+
+    def smtp_quit(self, command):
+        self.reply('221 Bye')
+        return False
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    """Принимает письма на свободном порту 127.0.0.1 и хранит их в messages.
+
+    Адреса из refused сервер отклоняет с кодом 550.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, refused=()):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.refused = set(refused)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,122 @@
+import asyncio
+
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from posts.models import Post, User
+
+
+class ASGIHandlerTest(TransactionTestCase):
+    '''The handler is driven directly with ASGI messages.
+
+    TransactionTestCase: views run in the handler's own thread, whose
+    connection only sees committed rows.
+    '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='SomeUsername')
+        Post.objects.create(text='Тестовый пост', author=self.user)
+        self.handler = ASGIHandler(threads=1)
+        self.addCleanup(self.handler.executor.shutdown)
+
+    def request(self, method, path, query_string=b'', body=(b'',),
+                headers=()):
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': query_string, 'headers': list(headers),
+            'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+        incoming = [
+            {'type': 'http.request', 'body': part,
+             'more_body': number < len(body) - 1}
+            for number, part in enumerate(body)
+        ]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(scope, receive, send))
+        return sent
+
+    def test_page(self):
+        '''A page is answered with status, headers and body.'''
+        start, *body = self.request(
+            'GET', reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        content = b''.join(message['body'] for message in body)
+        self.assertIn('Тестовый пост', content.decode())
+
+    def test_query_string_and_unicode_path(self):
+        '''Query strings and non-ASCII paths reach the view intact.'''
+        start, *_ = self.request('GET', '/profile/Пользователь/')
+        self.assertEqual(start['status'], 404)
+        start, *_ = self.request('GET', reverse('posts:search'),
+                                 query_string='q=пост'.encode())
+        self.assertEqual(start['status'], 200)
+
+    def test_request_body(self):
+        '''A body sent in parts is read in full.'''
+        token = 'a' * 64
+        start, *body = self.request(
+            'POST', reverse('users:login'),
+            body=(f'csrfmiddlewaretoken={token}&username=Some'.encode(),
+                  b'Username&password=wrong'),
+            headers=[
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'cookie', f'csrftoken={token}'.encode()),
+            ],
+        )
+        self.assertEqual(start['status'], 200)
+        content = b''.join(message['body'] for message in body)
+        self.assertIn('value="SomeUsername"', content.decode())
+
+    def test_streaming_response(self):
+        '''A streaming response is sent in chunks.'''
+        start, *body = self.request('GET', reverse('posts:api_index'))
+        self.assertEqual(start['status'], 200)
+        self.assertTrue(body[0]['more_body'])
+        self.assertFalse(body[-1].get('more_body', False))
+        content = b''.join(message['body'] for message in body)
+        self.assertIn('Тестовый пост', content.decode())
+
+    def test_disconnect_before_body(self):
+        '''A client gone before sending the body gets no response.'''
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(
+            {'type': 'http', 'method': 'POST', 'path': '/'}, receive, send
+        ))
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        '''Startup and shutdown are acknowledged.'''
+        incoming = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase
+
+from core.db import retry_locked
+from core.settings import SQLITE_LOCKED_RETRIES
+
+
+@skipUnless(connection.vendor == 'sqlite', 'PRAGMA только у SQLite')
+class SqlitePragmasTest(TestCase):
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        '''Every new SQLite connection gets the pragmas.'''
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(connection, 'cache_size'), -64000)
+
+    def test_file_database_uses_wal(self):
+        '''A file database is switched to write-ahead logging.'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict,
+             'NAME': os.path.join(directory, 'wal.sqlite3')},
+            alias='wal',
+        )
+        self.addCleanup(wrapper.close)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+
+
+@mock.patch('core.db.SQLITE_LOCKED_DELAY', 0)
+class RetryLockedTest(SimpleTestCase):
+
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @retry_locked
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'ok'
+        return write, calls
+
+    def test_retries_locked_writes(self):
+        '''A locked write is retried until it succeeds.'''
+        write, calls = self.flaky(2)
+        self.assertEqual(write(), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up(self):
+        '''After the last retry the error propagates.'''
+        write, calls = self.flaky(SQLITE_LOCKED_RETRIES + 1)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), SQLITE_LOCKED_RETRIES + 1)
+
+    def test_other_errors_are_not_retried(self):
+        '''Errors other than locks are raised at once.'''
+        write, calls = self.flaky(1, 'no such table: posts_post')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+    def test_not_retried_inside_transaction(self):
+        '''Inside an outer transaction the caller must roll back.'''
+        write, calls = self.flaky(1)
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            with self.assertRaises(OperationalError):
+                write()
+        self.assertEqual(len(calls), 1)
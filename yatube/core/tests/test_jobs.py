@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.jobs import (
+    PartialFailure, claim, enqueue, run_pending, task, work_off
+)
+from core.models import Job
+from core.settings import JOB_MAX_ATTEMPTS
+
+User = get_user_model()
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.record_batch', batch=True)
+def record_batch(payloads):
+    calls.append(sorted(payload['value'] for payload in payloads))
+
+
+@task(name='tests.create_users', batch=True)
+def create_users(payloads):
+    failed = []
+    for index, payload in enumerate(payloads):
+        if payload['value'] % 2:
+            failed.append(index)
+        else:
+            User.objects.create(username=f'user{payload["value"]}')
+    if failed:
+        raise PartialFailure(failed, 'Нечётные')
+
+
+@task(name='tests.explode')
+def explode():
+    raise RuntimeError('Взрыв')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        '''Queued jobs run once and leave the queue.'''
+        record.delay(value=1)
+        record.delay(value=2)
+        self.assertEqual(work_off(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_batch_task_gets_whole_batch(self):
+        '''A batch task is called once with every payload of the batch.'''
+        for value in (3, 1, 2):
+            record_batch.delay(value=value)
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_partial_failure_keeps_done_work(self):
+        '''Done items of a partly failed batch keep their writes.'''
+        for value in (1, 2, 4):
+            create_users.delay(value=value)
+        run_pending()
+        self.assertEqual(
+            sorted(User.objects.values_list('username', flat=True)),
+            ['user2', 'user4']
+        )
+        job = Job.objects.get()
+        self.assertEqual((job.payload, job.attempts), ('{"value": 1}', 1))
+
+    def test_future_jobs_wait(self):
+        '''Jobs scheduled in the future are not run yet.'''
+        enqueue('tests.record', run_at=timezone.now() + timedelta(hours=1),
+                value=1)
+        self.assertEqual(work_off(), 0)
+        self.assertEqual(calls, [])
+
+    def test_unknown_task(self):
+        '''Only registered tasks can be queued.'''
+        with self.assertRaises(LookupError):
+            enqueue('tests.missing')
+
+    def test_retries_with_backoff_then_fails(self):
+        '''A failing job is retried later and finally marked failed.'''
+        explode.delay()
+        delays = []
+        for _ in range(JOB_MAX_ATTEMPTS):
+            started = timezone.now()
+            self.assertEqual(run_pending(), 1)
+            job = Job.objects.get()
+            self.assertIn('Взрыв', job.error)
+            delays.append(job.run_at - started)
+            job.run_at = started
+            job.save()
+        self.assertTrue(job.failed)
+        self.assertEqual(job.attempts, JOB_MAX_ATTEMPTS)
+        self.assertEqual(run_pending(), 0)
+        self.assertLess(delays[0], delays[1])
+        self.assertLess(delays[1], delays[2])
+
+    def test_claimed_jobs_are_not_shared(self):
+        '''A job locked by one worker is not claimed by another.'''
+        record.delay(value=1)
+        self.assertEqual(len(claim('first')), 1)
+        self.assertEqual(claim('second'), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(len(claim('second')), 1)
+
+    def test_run_worker_once(self):
+        '''run_worker --once drains the queue and exits.'''
+        record.delay(value=1)
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertEqual(calls, [1])
+        self.assertIn('1', out.getvalue())
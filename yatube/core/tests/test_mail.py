@@ -0,0 +1,119 @@
+import socket
+
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.jobs import run_pending, work_off
+from core.metrics import registry
+from core.models import Job
+from core.tests.smtp import SMTPServer
+from posts.models import User
+
+PASSWORD_RESET = reverse('users:password_reset')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    EMAIL_TIMEOUT=5,
+)
+class QueuedMailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        password = make_password('password')
+        User.objects.bulk_create(
+            User(username=f'SomeUser{i}', email=f'user{i}@example.com',
+                 password=password)
+            for i in range(20)
+        )
+
+    def setUp(self):
+        registry.clear()
+        self.smtp = SMTPServer(refused={'user3@example.com'}).__enter__()
+        self.addCleanup(self.smtp.__exit__)
+
+    def reset_storm(self):
+        guest = Client()
+        for i in range(20):
+            response = guest.post(PASSWORD_RESET,
+                                  {'email': f'user{i}@example.com'})
+            self.assertEqual(response.status_code, 302)
+
+    def test_password_reset_is_queued(self):
+        '''Password reset returns before any SMTP traffic.'''
+        with self.settings(EMAIL_PORT=self.smtp.port):
+            self.reset_storm()
+        self.assertEqual(Job.objects.count(), 20)
+        self.assertEqual(self.smtp.connections, 0)
+        self.assertIn('yatube_mail_messages_total{status="queued"} 20',
+                      registry.render())
+
+    def test_batch_uses_one_connection(self):
+        '''A batch goes over one SMTP session; refusals retry alone.'''
+        with self.settings(EMAIL_PORT=self.smtp.port):
+            self.reset_storm()
+            self.assertEqual(run_pending(), 20)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 19)
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('user3@example.com', job.error)
+        metrics = registry.render()
+        self.assertIn('yatube_mail_messages_total{status="sent"} 19', metrics)
+        self.assertIn('yatube_mail_messages_total{status="failed"} 1',
+                      metrics)
+        self.assertIn('yatube_mail_batches_total{} 1', metrics)
+        staff = Client()
+        staff.force_login(User.objects.create(username='staff',
+                                              is_staff=True))
+        self.assertContains(
+            staff.get(reverse('metrics')),
+            'yatube_jobs{task="core.mail.deliver_mail",state="queued"} 1'
+        )
+
+    def test_unreachable_server_retries_batch(self):
+        '''When SMTP is down the whole batch stays queued.'''
+        with self.settings(EMAIL_PORT=free_port()):
+            self.reset_storm()
+            self.assertEqual(run_pending(), 20)
+        self.assertEqual(Job.objects.filter(attempts=1).count(), 20)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class MailSerializationTest(TestCase):
+    def test_message_round_trip(self):
+        '''Alternatives, headers and attachments survive the queue.'''
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], headers={'X-Test': '1'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\x01', 'application/octet-stream')
+        message.attach('note.txt', 'Заметка', 'text/plain')
+        self.assertEqual(message.send(), 1)
+        self.assertEqual(mail.outbox, [])
+        work_off()
+        sent, = mail.outbox
+        self.assertEqual(sent.subject, 'Тема')
+        self.assertEqual(sent.recipients(),
+                         ['to@example.com', 'cc@example.com'])
+        self.assertEqual(sent.extra_headers, {'X-Test': '1'})
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+        self.assertEqual(sent.attachments, [
+            ('data.bin', b'\x00\x01', 'application/octet-stream'),
+            ('note.txt', 'Заметка', 'text/plain'),
+        ])
@@ -0,0 +1,85 @@
+import re
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from posts.models import Post, User
+
+MAIN_PAGE = reverse('posts:main_page')
+METRICS = reverse('metrics')
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+        cls.guest = Client()
+        cls.staff = Client()
+        cls.staff.force_login(
+            User.objects.create(username='Staff', is_staff=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def value(self, text, line):
+        match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.M)
+        self.assertIsNotNone(match, line)
+        return float(match.group(1))
+
+    def test_metrics_per_view(self):
+        '''Requests are aggregated per view name'''
+        self.guest.get(MAIN_PAGE)
+        self.guest.get(MAIN_PAGE)
+        self.guest.get('/unexisting/')
+        text = self.staff.get(METRICS).content.decode()
+        view = '{view="posts:main_page"}'
+        self.assertEqual(
+            self.value(text, f'yatube_request_seconds_count{view}'), 2
+        )
+        # Первый запрос идёт в базу, второй берётся из кеша лент.
+        self.assertEqual(self.value(text, f'yatube_sql_queries_sum{view}'), 2)
+        self.assertGreater(
+            self.value(text, f'yatube_template_seconds_sum{view}'), 0
+        )
+        self.assertEqual(self.value(
+            text,
+            'yatube_sql_queries_bucket{view="posts:main_page",le="+Inf"}'
+        ), 2)
+        self.assertEqual(self.value(
+            text, 'yatube_request_seconds_count{view="unresolved"}'
+        ), 1)
+
+    def test_streamed_queries_are_counted(self):
+        '''Queries made while streaming count once the body is sent'''
+        response = self.guest.get(reverse('posts:api_index'))
+        self.assertNotIn('posts:api_index',
+                         self.staff.get(METRICS).content.decode())
+        b''.join(response.streaming_content)
+        text = self.staff.get(METRICS).content.decode()
+        view = '{view="posts:api_index"}'
+        self.assertEqual(
+            self.value(text, f'yatube_request_seconds_count{view}'), 1
+        )
+        self.assertEqual(self.value(text, f'yatube_sql_queries_sum{view}'), 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_are_private(self):
+        '''Only staff and the scraper token may read metrics'''
+        reader = Client()
+        reader.force_login(self.user)
+        for client, headers, status in (
+            (self.guest, {}, 403),
+            (reader, {}, 403),
+            (self.guest, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, 403),
+            (self.guest, {'HTTP_AUTHORIZATION': 'Bearer secret'}, 200),
+            (self.staff, {}, 200),
+        ):
+            with self.subTest(client=client, headers=headers):
+                response = client.get(METRICS, **headers)
+                self.assertEqual(response.status_code, status)
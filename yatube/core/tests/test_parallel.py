@@ -0,0 +1,80 @@
+import threading
+
+from django.db import transaction
+from django.http import Http404
+from django.test import TransactionTestCase
+
+from core import parallel, routers
+from core.metrics import RequestStats, set_current_stats
+from posts.models import User
+
+
+class GatherTest(TransactionTestCase):
+    '''TransactionTestCase: pool threads only see committed rows.'''
+
+    def setUp(self):
+        User.objects.create(username='SomeUsername')
+
+    def test_results_keep_order(self):
+        '''Functions run in different threads, results keep their order.'''
+        threads = parallel.gather(
+            lambda: threading.current_thread().name,
+            lambda: threading.current_thread().name,
+        )
+        self.assertEqual(threads[0], threading.current_thread().name)
+        self.assertTrue(threads[1].startswith('query'))
+        self.assertEqual(
+            parallel.gather(lambda: 1, lambda: User.objects.get().username),
+            [1, 'SomeUsername']
+        )
+
+    def test_error_is_raised(self):
+        '''An exception from a pool thread reaches the caller.'''
+        def missing():
+            raise Http404
+
+        with self.assertRaises(Http404):
+            parallel.gather(lambda: None, missing)
+
+    def test_queries_are_counted(self):
+        '''Queries from pool threads count towards the request stats.'''
+        count = User.objects.count
+        # Первый запрос в новом потоке ещё и настраивает соединение.
+        parallel.gather(count, count)
+        stats = RequestStats()
+        set_current_stats(stats)
+        self.addCleanup(set_current_stats, None)
+        parallel.gather(count, count)
+        self.assertEqual(stats.queries, 1)
+
+    def test_primary_pin_is_passed(self):
+        '''Pool threads read from the primary when the caller is pinned.'''
+        with routers.use_primary():
+            pinned = parallel.gather(routers.is_pinned, routers.is_pinned)
+        self.assertEqual(pinned, [True, True])
+
+    def test_pool_writes_pin_caller(self):
+        '''A write in a pool thread pins the request, not the thread.'''
+        routers.reset()
+        self.addCleanup(routers.reset)
+        parallel.gather(lambda: None,
+                        lambda: User.objects.create(username='Written'))
+        self.assertTrue(routers.has_written())
+        routers.reset()
+        self.assertEqual(
+            parallel.gather(routers.has_written, routers.has_written),
+            [False, False]
+        )
+
+    def test_serial_inside_transaction(self):
+        '''Inside a transaction everything runs in the calling thread.'''
+        with transaction.atomic():
+            User.objects.create(username='Uncommitted')
+            self.assertEqual(
+                parallel.gather(
+                    lambda: threading.current_thread().name,
+                    lambda: User.objects.filter(
+                        username='Uncommitted').exists(),
+                ),
+                [threading.current_thread().name, True]
+            )
@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import ReadYourWritesMiddleware
+from core.routers import PrimaryReplicaRouter, use_primary
+from core.settings import REPLICA_PIN_COOKIE
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_reads_go_to_replicas(self):
+        '''Reads go to a replica, writes to the primary.'''
+        self.assertEqual(self.router.db_for_read(None), 'replica')
+        self.assertEqual(self.router.db_for_write(None), PRIMARY)
+
+    def test_reads_after_write_go_to_primary(self):
+        '''After a write the thread reads its own writes.'''
+        self.router.db_for_write(None)
+        self.assertEqual(self.router.db_for_read(None), PRIMARY)
+
+    def test_use_primary(self):
+        '''use_primary pins reads for the block only.'''
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(None), PRIMARY)
+        self.assertEqual(self.router.db_for_read(None), 'replica')
+
+    def test_reads_in_transaction_go_to_primary(self):
+        '''Inside a primary transaction reads see its uncommitted rows.'''
+        with mock.patch.object(connections[PRIMARY], 'in_atomic_block',
+                               True):
+            self.assertEqual(self.router.db_for_read(None), PRIMARY)
+
+    def test_without_replicas(self):
+        '''Without replicas everything uses the primary.'''
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(None), PRIMARY)
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate(PRIMARY, 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadYourWritesMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def run_request(self, request, write=False):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(None))
+            if write:
+                self.router.db_for_write(None)
+            return HttpResponse()
+
+        response = ReadYourWritesMiddleware(view)(request)
+        return seen[0], response
+
+    def test_reads_use_replica(self):
+        '''A plain GET reads from a replica and sets no cookie.'''
+        db, response = self.run_request(self.factory.get('/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_write_pins_next_requests(self):
+        '''A write sets the pin cookie that routes reads to the primary.'''
+        db, response = self.run_request(self.factory.post('/create/'),
+                                        write=True)
+        self.assertEqual(db, PRIMARY)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        request = self.factory.get('/profile/SomeUsername/')
+        request.COOKIES[REPLICA_PIN_COOKIE] = '1'
+        self.assertEqual(self.run_request(request)[0], PRIMARY)
+        self.assertEqual(routers.is_pinned(), False)
+
+    def test_admin_uses_primary(self):
+        '''Admin pages always read from the primary.'''
+        self.assertEqual(
+            self.run_request(self.factory.get('/admin/posts/post/'))[0],
+            PRIMARY
+        )
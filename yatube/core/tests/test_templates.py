@@ -0,0 +1,67 @@
+import copy
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from core.template.warmup import template_names, warm_templates
+
+TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'templates')
+
+
+def engine():
+    return engines.all()[0]
+
+
+def cached_loader():
+    return engine().engine.template_loaders[0]
+
+
+class WarmTemplatesTest(SimpleTestCase):
+
+    def setUp(self):
+        cached_loader().reset()
+
+    def test_every_template_is_cached(self):
+        '''Warming parses every project template once.'''
+        names = list(template_names(TEMPLATES_DIR))
+        self.assertIn('posts/includes/paginator.html', names)
+        self.assertEqual(warm_templates(), (len(names), {}))
+        loader = cached_loader()
+        with mock.patch.object(loader.loaders[0], 'get_contents') as read:
+            engine().get_template('base.html')
+            engine().get_template('posts/includes/paginator.html')
+        read.assert_not_called()
+
+    def test_broken_template(self):
+        '''A broken template is reported without stopping the others.'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'broken.html'), 'w') as file:
+            file.write('{% if %}')
+        with open(os.path.join(directory, 'fine.html'), 'w') as file:
+            file.write('{{ value }}')
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['DIRS'] = [directory]
+        with override_settings(TEMPLATES=templates):
+            with self.assertLogs('core.template.warmup', 'ERROR'):
+                warmed, errors = warm_templates()
+            self.assertEqual(warmed, 1)
+            self.assertEqual(list(errors), ['broken.html'])
+            with self.assertRaisesMessage(CommandError, 'broken.html'):
+                call_command('warm_templates', stdout=StringIO())
+
+    def test_command(self):
+        '''The command reports how many templates it parsed.'''
+        output = StringIO()
+        call_command('warm_templates', stdout=output)
+        self.assertIn(
+            f'Шаблонов: {len(list(template_names(TEMPLATES_DIR)))}',
+            output.getvalue()
+        )
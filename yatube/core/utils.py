@@ -0,0 +1,23 @@
+import itertools
+
+from django.conf import settings
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def batched(iterable, size):
+    """Списки по size элементов; память не зависит от длины iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_process_local(alias):
+    """Свой ли у каждого процесса кеш alias (LocMemCache).
+
+    Запись в такой кеш не видят ни другие веб-процессы, ни воркер.
+    """
+    return settings.CACHES[alias]['BACKEND'] == LOCMEM
@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from core.jobs import queue_metrics
+from core.metrics import registry
 
 
 def page_not_found(request, exception):
@@ -7,3 +14,21 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def can_read_metrics(request):
+    """Персонал сайта или сборщик с токеном METRICS_TOKEN."""
+    if request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics(request):
+    # Времена SQL и шаблонов и глубина очередей — не для посетителей.
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(registry.render() + queue_metrics(),
+                        content_type='text/plain; version=0.0.4')
@@ -1,7 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
+from .models import Follow
 from .models import Post
 from .models import Group
+from .search import get_backend
+from posts.settings import SEARCH_FALLBACK_LIMIT
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,6 +14,25 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%q%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        backend = get_backend()
+        if not backend.shared:
+            found = backend.count(search_term)
+            if found > SEARCH_FALLBACK_LIMIT:
+                messages.warning(request, (
+                    f'Найдено {found} постов, показаны '
+                    f'{SEARCH_FALLBACK_LIMIT} самых подходящих: '
+                    f'уточните запрос.'
+                ))
+        return backend.filter(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
+admin.site.register(Follow)
@@ -0,0 +1,127 @@
+"""JSON API лент и постов только для чтения.
+
+Строки берутся из .values() с фиксированным набором полей, без моделей,
+а ответ лент отдаётся потоком по посту: сериализация одного поста — это
+isoformat даты и один вызов JSONEncoder.encode для словаря из пяти полей.
+Страницы адресуются курсором, как в CursorPaginator.
+"""
+import json
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from .cache import conditional, feed_etag, group_scope, profile_scope
+from .models import Group, Post, User
+from .paginator import NEXT, PREVIOUS, CursorPaginator
+from .views import index_scope, post_last_modified, post_validators
+from posts.settings import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+
+API_FIELDS = ('id', 'text', 'pub_date', 'author__username', 'group__slug')
+ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+NOT_FOUND = {'detail': 'Не найдено'}
+
+
+def api_rows(queryset):
+    return queryset.values(*API_FIELDS)
+
+
+def encode_post(row):
+    return ENCODER.encode({
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'].isoformat(),
+        'author': row['author__username'],
+        'group': row['group__slug'],
+    })
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        limit = API_PAGE_SIZE
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def stream_page(request, queryset):
+    """Страница ленты потоком: {"results": [...], "next": ..., ...}.
+
+    Строки читаются итератором по мере отправки и в памяти не копятся.
+    """
+    paginator = CursorPaginator(api_rows(queryset), page_limit(request))
+    cursor = request.GET.get('cursor')
+    position = paginator.decode_cursor(cursor) if cursor else None
+    if position is not None and position[0] == PREVIOUS:
+        # Предыдущая страница выбирается по возрастанию, и её пришлось бы
+        # держать в памяти, чтобы развернуть. Вместо этого находим ключ
+        # строки сразу за ней и читаем страницу обычным ходом к старым.
+        # Если такой строки нет, это просто первая страница.
+        keys = paginator.rows_from(*position).values_list(
+            paginator.date_field, 'pk'
+        )[paginator.per_page:paginator.per_page + 1]
+        position = next(((NEXT, date, pk) for date, pk in keys), None)
+    rows = paginator.rows_from(*position or (NEXT, None, None))
+
+    def chunks():
+        yield '{"results":['
+        first = last = None
+        has_more = False
+        for count, row in enumerate(
+            rows[:paginator.per_page + 1].iterator(), 1
+        ):
+            if count > paginator.per_page:
+                has_more = True
+                break
+            yield encode_post(row) if first is None else ',' + encode_post(row)
+            first, last = first or row, row
+        next_cursor = previous_cursor = None
+        if last is not None and has_more:
+            next_cursor = paginator.encode_cursor(NEXT, last)
+        if first is not None and position is not None:
+            previous_cursor = paginator.encode_cursor(PREVIOUS, first)
+        yield '],"next":{},"previous":{}}}'.format(
+            ENCODER.encode(next_cursor), ENCODER.encode(previous_cursor)
+        )
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+@require_safe
+@conditional(etag_func=feed_etag(index_scope, per_user=False))
+def index(request):
+    return stream_page(request, Post.objects.all())
+
+
+@require_safe
+@conditional(etag_func=feed_etag(group_scope, per_user=False))
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return JsonResponse(NOT_FOUND, status=404)
+    return stream_page(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+@conditional(etag_func=feed_etag(profile_scope, per_user=False))
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return JsonResponse(NOT_FOUND, status=404)
+    return stream_page(request, Post.objects.filter(author_id=author_id))
+
+
+def post_etag(request, post_id):
+    return post_validators(request, post_id)[0]
+
+
+@require_safe
+@conditional(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_detail(request, post_id):
+    row = api_rows(Post.objects.filter(pk=post_id)).first()
+    if row is None:
+        return JsonResponse(NOT_FOUND, status=404)
+    return HttpResponse(encode_post(row), content_type='application/json')
@@ -0,0 +1,236 @@
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import condition
+
+from core.holes import fill_holes
+from core.routers import use_primary
+from core.settings import REPLICA_PIN_SECONDS
+from .paginator import CursorPaginator
+from posts.settings import FEED_CACHE, FEED_CACHE_TIMEOUT, FEED_PAGINATION
+
+# Версия, общая для всех лент: её сдвигают изменения, задевающие всё сразу.
+ALL = 'all'
+INDEX = 'index'
+# Заголовки ответа, которые хранятся в кеше вместе со страницей.
+CACHED_HEADERS = ('Content-Type', 'Last-Modified')
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def post_feeds(username, slug):
+    """Ленты, в которых виден пост автора username из группы slug."""
+    feeds = [INDEX, profile_scope(username)]
+    if slug:
+        feeds.append(group_scope(slug))
+    return feeds
+
+
+def digest(value):
+    """Короткий стабильный хеш для ключей кеша и ETag."""
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def feed_position(request):
+    """Какая страница ленты запрошена, по одним лишь ?page= и ?cursor=.
+
+    Остальные параметры запроса на страницу не влияют, и ими нельзя
+    наплодить ключей кеша.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is not None or FEED_PAGINATION == 'cursor':
+        position = CursorPaginator.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return 'cursor:'
+        direction, date, pk = position
+        return f'cursor:{direction}|{date.isoformat()}|{pk}'
+    try:
+        number = max(int(request.GET.get('page')), 1)
+    except (TypeError, ValueError):
+        number = 1
+    return f'page:{number}'
+
+
+def _version_key(scope):
+    return f'feed:version:{digest(scope)}'
+
+
+def feed_versions(*scopes):
+    """Текущие версии лент; отсутствующая версия заводится заново.
+
+    Новая версия берётся от времени, а не с единицы, чтобы после
+    вытеснения ключа из кеша не совпасть со старой и не отдать
+    устаревшие страницы.
+    """
+    cache = caches[FEED_CACHE]
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bumped_key(scope):
+    return f'feed:bumped:{digest(scope)}'
+
+
+def _bump_versions(scopes):
+    cache = caches[FEED_CACHE]
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), None)
+    # Пока реплики могут не видеть правку, страницы этих лент читаются
+    # из основной базы (см. cache_feed).
+    cache.set_many({_bumped_key(scope): True for scope in scopes},
+                   REPLICA_PIN_SECONDS)
+
+
+def recently_bumped(*scopes):
+    """Сдвигалась ли версия одной из лент за последние REPLICA_PIN_SECONDS."""
+    return bool(caches[FEED_CACHE].get_many(
+        [_bumped_key(scope) for scope in scopes]
+    ))
+
+
+def invalidate_feeds(*scopes):
+    """Сдвигает версии лент, после чего их страницы в кеше не читаются.
+
+    Версии сдвигаются после коммита: иначе читатель успел бы отрендерить
+    ленту без незакоммиченной правки и положить её под новую версию.
+    Вне транзакции сдвиг происходит сразу.
+    """
+    scopes = set(scopes)
+    transaction.on_commit(lambda: _bump_versions(scopes))
+
+
+def feed_etag(scope, per_user=True):
+    """ETag страницы ленты для condition() без единого запроса к постам.
+
+    Валидатор собран из версий ленты, которые сдвигаются при каждом
+    создании, правке и удалении поста, пути запроса и посетителя:
+    шапка страницы у каждого своя. Ответам без шапки (API) посетитель
+    не нужен, и per_user=False не трогает сессию; в их ETag входят все
+    параметры запроса, включая размер страницы.
+    """
+    def etag(request, *args, **kwargs):
+        versions = feed_versions(ALL, scope(*args, **kwargs))
+        if not per_user:
+            return digest(f'{versions}|{request.get_full_path()}')
+        return digest(
+            f'{versions}|{request.path}|{feed_position(request)}|'
+            f'{request.user.pk}'
+        )
+    return etag
+
+
+def _fill_response(response, request):
+    """Заполняет метки в ответе, который не попадёт в кеш."""
+    if not response.streaming and response.content:
+        response.content = fill_holes(
+            response.content.decode(response.charset), request
+        )
+    return response
+
+
+def conditional(etag_func=None, last_modified_func=None):
+    """condition(), но валидаторы получают только ответы 200.
+
+    У ответа 404 или редиректа ETag не ставится, и клиент не будет
+    переспрашивать по нему отсутствующую страницу.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func, last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_feed(scope, holes=True):
+    """Кеширует страницы ленты, общие для всех посетителей.
+
+    scope получает аргументы view и возвращает имя ленты; ключ страницы
+    строится из версий ленты, пути и feed_position(), так что ?page= и
+    ?cursor= кешируются раздельно. Номер за пределами ленты (?page=999
+    отдаёт последнюю страницу) в кеш не попадает. Персональные фрагменты
+    ({% hole %}) хранятся в кеше метками и заполняются при каждой отдаче,
+    поэтому авторизованные читатели попадают в тот же кеш, что и
+    анонимные. В RSS и Atom фрагментов нет, и с holes=False ответ
+    отдаётся как есть. Вместе с телом хранится Last-Modified, если view
+    его поставил, и по нему же отвечается If-Modified-Since.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            feed = scope(*args, **kwargs)
+            position = feed_position(request)
+            versions = feed_versions(ALL, feed)
+            key = 'feed:response:{}:{}'.format(
+                digest(f'{feed}|{request.path}|{position}'),
+                '.'.join(map(str, versions)),
+            )
+            cache = caches[FEED_CACHE]
+            cached = cache.get(key)
+            if cached is None:
+                # Сразу после сдвига версии реплика может ещё не видеть
+                # правку, и страница из неё застряла бы в кеше под новой
+                # версией. Остальные промахи читают реплики.
+                pinned = recently_bumped(ALL, feed)
+                request.punch_holes = holes
+                try:
+                    with use_primary() if pinned else nullcontext():
+                        response = view(request, *args, **kwargs)
+                finally:
+                    # Http404 из view рендерит страницу ошибки уже после
+                    # выхода отсюда: ей нужны фрагменты, а не метки.
+                    request.punch_holes = False
+                served = getattr(request, 'feed_page_number', None)
+                if response.status_code != 200 or (
+                        served is not None and position != f'page:{served}'):
+                    return (_fill_response(response, request) if holes
+                            else response)
+                cached = (
+                    response.content.decode(response.charset),
+                    {name: response[name] for name in CACHED_HEADERS
+                     if response.has_header(name)},
+                )
+                cache.set(key, cached, FEED_CACHE_TIMEOUT)
+            content, headers = cached
+            response = HttpResponse(
+                fill_holes(content, request) if holes else content
+            )
+            for name, value in headers.items():
+                response[name] = value
+            last_modified = parse_http_date_safe(response.get('Last-Modified'))
+            if last_modified is None:
+                return response
+            return get_conditional_response(
+                request, last_modified=last_modified, response=response
+            )
+        return wrapper
+    return decorator
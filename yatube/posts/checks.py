@@ -0,0 +1,20 @@
+from django.core.checks import Tags, Warning, register
+
+from core.utils import is_process_local
+from posts.settings import FEED_CACHE
+
+
+@register(Tags.caches, deploy=True)
+def check_feed_cache(app_configs, **kwargs):
+    if not is_process_local(FEED_CACHE):
+        return []
+    return [Warning(
+        'Кеш лент FEED_CACHE — LocMemCache, свой у каждого процесса.',
+        hint=(
+            'Правки постов в одном процессе и миниатюры, готовые в '
+            'воркере (make_thumbnails), не сбросят страницы в кеше '
+            'остальных: те обновятся только через FEED_CACHE_TIMEOUT. '
+            'Укажите общий кеш, например memcached.'
+        ),
+        id='posts.W001',
+    )]
@@ -0,0 +1,107 @@
+"""RSS и Atom для всего сайта, групп и авторов.
+
+Лента собирается из SYNDICATION_ITEMS последних постов одним запросом
+(автор и группа через JOIN) и кешируется так же, как HTML-ленты: до
+сдвига версии её области, то есть до следующей правки поста в ней.
+"""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .cache import (
+    cache_feed, conditional, feed_etag, group_scope, profile_scope
+)
+from .models import Group, Post, User
+from .views import index_scope
+from posts.settings import SYNDICATION_ITEMS
+
+
+class PostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов Yatube'
+
+    def link(self):
+        return reverse('posts:main_page')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).for_feed()[:SYNDICATION_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(8)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.slug] if item.group_id else []
+
+
+class GroupPostsFeed(PostsFeed):
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class ProfilePostsFeed(PostsFeed):
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return self.title(obj)
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+def atom(feed_class):
+    return type(f'Atom{feed_class.__name__}', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,
+    })
+
+
+def cached(feed, scope):
+    return conditional(etag_func=feed_etag(scope, per_user=False))(
+        cache_feed(scope, holes=False)(feed)
+    )
+
+
+index_rss = cached(PostsFeed(), index_scope)
+index_atom = cached(atom(PostsFeed)(), index_scope)
+group_rss = cached(GroupPostsFeed(), group_scope)
+group_atom = cached(atom(GroupPostsFeed)(), group_scope)
+profile_rss = cached(ProfilePostsFeed(), profile_scope)
+profile_atom = cached(atom(ProfilePostsFeed)(), profile_scope)
@@ -0,0 +1,151 @@
+import json
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.db import apply_sqlite_pragmas
+from posts.management.commands.benchmark_posts import (
+    percentile, test_database
+)
+from posts.models import Post, User
+from posts.seeding import seed
+
+
+def reader(number, post_ids, usernames):
+    rng = random.Random(number)
+    pages = (
+        lambda: reverse('posts:post_detail', args=[rng.choice(post_ids)]),
+        lambda: reverse('posts:api_profile', args=[rng.choice(usernames)]),
+        lambda: reverse('posts:api_index'),
+    )
+    client = Client()
+    return lambda: client.get(rng.choice(pages)())
+
+
+def writer(user):
+    client = Client()
+    client.force_login(user)
+    url = reverse('posts:post_create')
+    return lambda: client.post(url, {'text': 'Нагрузка'})
+
+
+def work(kind, make_request, args, deadline, queue):
+    """Цикл запросов одного процесса нагрузки до deadline."""
+    timings, errors = [], 0
+    request = make_request(*args)
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            failed = request().status_code >= 500
+        except Exception:
+            failed = True
+        if failed:
+            errors += 1
+        else:
+            timings.append(time.perf_counter() - started)
+    queue.put((kind, timings, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет чтение при одновременной записи на файловой SQLite: '
+        'пропускную способность, задержки и ошибки блокировок (JSON).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-tuning', action='store_true',
+                            help='Без PRAGMA из core.db, для сравнения.')
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        if options['no_tuning']:
+            connection_created.disconnect(apply_sqlite_pragmas)
+        try:
+            # WAL работает только с файлом, поэтому база не в памяти.
+            with override_settings(DEBUG=False), test_database(on_disk=True):
+                seed(options['users'], 10, options['posts'],
+                     seed=options['seed'])
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                report = {
+                    'config': {
+                        key: options[key] for key in
+                        ('readers', 'writers', 'seconds', 'posts',
+                         'no_tuning')
+                    },
+                    'journal_mode': journal_mode,
+                    **self.run_load(options),
+                }
+        finally:
+            if options['no_tuning']:
+                connection_created.connect(apply_sqlite_pragmas)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def run_load(self, options):
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        usernames = list(User.objects.values_list('username', flat=True))
+        writers = list(User.objects.order_by('pk')[:options['writers']])
+        # Отдельные процессы, а не потоки: иначе всё упрётся в GIL, а не
+        # в блокировки SQLite. Соединения не должны достаться потомкам.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        deadline = time.monotonic() + options['seconds']
+
+        processes = [
+            context.Process(target=work, args=[
+                'read', reader, (number, post_ids, usernames), deadline, queue
+            ])
+            for number in range(options['readers'])
+        ] + [
+            context.Process(target=work, args=[
+                'write', writer, (user,), deadline, queue
+            ])
+            for user in writers
+        ]
+        for process in processes:
+            process.start()
+        results = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        for _ in processes:
+            kind, timings, failed = queue.get()
+            results[kind] += timings
+            errors[kind] += failed
+        for process in processes:
+            process.join()
+        return {
+            kind: self.summary(results[kind], errors[kind],
+                               options['seconds'])
+            for kind in results
+        }
+
+    @staticmethod
+    def summary(timings, errors, seconds):
+        timings.sort()
+        if not timings:
+            return {'requests': 0, 'errors': errors}
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'per_second': round(len(timings) / seconds, 1),
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        }
@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.seeding import seed
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, math.ceil(share * len(values)) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+@contextmanager
+def test_database(on_disk=False):
+    """Отдельная тестовая база на время замера, рабочая не трогается.
+
+    С on_disk база создаётся файлом во временном каталоге, чтобы её видели
+    соединения других потоков и процессов. Настройки соединения после
+    замера возвращаются как были, каталог удаляется.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        if on_disk:
+            test_settings['NAME'] = os.path.join(
+                directory, 'benchmark.sqlite3'
+            )
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        try:
+            connection.creation.create_test_db(verbosity=0, serialize=False)
+            try:
+                yield
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            test_settings['NAME'] = old_test_name
+            teardown_test_environment()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, RPS и число запросов к БД для страниц постов '
+        'на отдельной тестовой базе и печатает результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждую страницу.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть не меньше 1')
+        # Как и тестовый раннер, меряем с выключенным DEBUG.
+        with override_settings(DEBUG=False), self.test_database():
+            started = time.perf_counter()
+            seed(options['users'], options['groups'], options['posts'],
+                 seed=options['seed'])
+            report = {
+                'config': {
+                    key: options[key] for key in
+                    ('users', 'groups', 'posts', 'requests', 'seed', 'cold')
+                },
+                'seed_seconds': round(time.perf_counter() - started, 3),
+                'views': self.run_views(options),
+            }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def test_database(self):
+        return test_database()
+
+    def run_views(self, options):
+        rng = random.Random(options['seed'])
+        user = User.objects.order_by('pk').first()
+        usernames = list(User.objects.values_list('username', flat=True))
+        slugs = list(Group.objects.values_list('slug', flat=True))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        own_post_ids = list(user.posts.values_list('pk', flat=True))
+        pages = max(1, len(post_ids) // 10)
+        guest = Client()
+        author = Client()
+        author.force_login(user)
+        scenarios = {
+            'index': lambda: guest.get(
+                reverse('posts:main_page'),
+                {'page': rng.randint(1, pages)}
+            ),
+            'group_list': lambda: guest.get(
+                reverse('posts:group_list', args=[rng.choice(slugs)])
+            ),
+            'profile': lambda: guest.get(
+                reverse('posts:profile', args=[rng.choice(usernames)])
+            ),
+            'post_detail': lambda: guest.get(
+                reverse('posts:post_detail', args=[rng.choice(post_ids)])
+            ),
+            'post_create': lambda: author.post(
+                reverse('posts:post_create'), {'text': 'Новый пост'}
+            ),
+            'post_edit': lambda: author.post(
+                reverse('posts:post_edit', args=[rng.choice(own_post_ids)]),
+                {'text': 'Измененный пост'}
+            ),
+        }
+        if not slugs:
+            del scenarios['group_list']
+        if not own_post_ids:
+            del scenarios['post_edit']
+        return {
+            name: self.measure(request, options)
+            for name, request in scenarios.items()
+        }
+
+    def measure(self, request, options):
+        timings = []
+        queries = 0
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                request()
+                timings.append(time.perf_counter() - started)
+            queries += len(captured)
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'rps': round(len(timings) / sum(timings), 1),
+            'queries_per_request': round(queries / len(timings), 2),
+        }
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from posts.management.commands.benchmark_posts import (
+    percentile, test_database
+)
+from posts.models import Post, User
+from posts.seeding import seed
+
+HOST = '127.0.0.1'
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с фиксированным числом потоков, как gunicorn --threads.
+
+    Поток занят соединением от первого байта запроса до последнего байта
+    ответа, в том числе пока медленный клиент досылает запрос.
+    """
+
+    request_queue_size = 1024
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request,
+                             client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def serve_wsgi(port, threads):
+    server = PooledWSGIServer((HOST, port), threads)
+    server.set_app(WSGIHandler())
+    server.serve_forever()
+
+
+async def asgi_connection(app, reader, writer):
+    """Минимальный HTTP/1.1 для ASGI: один запрос на соединение."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        writer.close()
+        return
+    request_line, *lines = head.decode('latin-1').rstrip().split('\r\n')
+    method, target, version = request_line.split(' ')
+    headers = []
+    for line in lines:
+        name, _, value = line.partition(':')
+        headers.append((name.strip().lower().encode('latin-1'),
+                        value.strip().encode('latin-1')))
+    length = int(dict(headers).get(b'content-length', 0))
+    body = await reader.readexactly(length)
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'scheme': 'http',
+        'http_version': version.split('/')[1], 'path': unquote(path),
+        'query_string': query.encode('latin-1'), 'root_path': '',
+        'headers': headers, 'server': (HOST, writer.get_extra_info(
+            'sockname')[1]),
+        'client': writer.get_extra_info('peername')[:2],
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            writer.write(f'HTTP/1.1 {message["status"]} -\r\n'.encode())
+            for name, value in message['headers']:
+                writer.write(name + b': ' + value + b'\r\n')
+            writer.write(b'Connection: close\r\n\r\n')
+        else:
+            writer.write(message.get('body', b''))
+        await writer.drain()
+
+    await app(scope, receive, send)
+    writer.close()
+
+
+def serve_asgi(port, threads):
+    app = ASGIHandler(threads)
+
+    async def main():
+        server = await asyncio.start_server(
+            lambda reader, writer: asgi_connection(app, reader, writer),
+            HOST, port, backlog=1024,
+        )
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+SERVERS = {'wsgi': serve_wsgi, 'asgi': serve_asgi}
+
+
+async def fetch(port, path, timeout):
+    """Один запрос быстрого клиента: статус и время, None при таймауте."""
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(HOST, port), timeout
+        )
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: testserver\r\n'
+                     f'Connection: close\r\n\r\n'.encode())
+        response = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+    except (asyncio.TimeoutError, OSError):
+        return None
+    status = int(response.split(b' ', 2)[1]) if response else 0
+    return status, time.perf_counter() - started
+
+
+async def slow_client(port, path, hold, deadline):
+    """Досылает заголовки по одному, пока не выйдет hold секунд.
+
+    Так ведут себя клиенты на плохой мобильной сети: соединение открыто,
+    но запрос ещё не пришёл целиком.
+    """
+    completed = 0
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: testserver\r\n'
+                         .encode())
+            finish = time.monotonic() + hold
+            header = 0
+            while time.monotonic() < finish:
+                await asyncio.sleep(0.1)
+                writer.write(f'X-Slow-{header}: 1\r\n'.encode())
+                header += 1
+            writer.write(b'Connection: close\r\n\r\n')
+            await reader.read()
+            writer.close()
+            completed += 1
+        except OSError:
+            await asyncio.sleep(0.1)
+    return completed
+
+
+async def fast_client(port, paths, rng, timeout, deadline):
+    timings, errors, timeouts = [], 0, 0
+    while time.monotonic() < deadline:
+        result = await fetch(port, rng.choice(paths), timeout)
+        if result is None:
+            timeouts += 1
+        elif result[0] >= 500 or result[0] == 0:
+            errors += 1
+        else:
+            timings.append(result[1])
+    return timings, errors, timeouts
+
+
+async def run_load(port, paths, options):
+    deadline = time.monotonic() + options['seconds']
+    rng = random.Random(options['seed'])
+    slow = [
+        asyncio.ensure_future(
+            slow_client(port, paths[0], options['hold'], deadline)
+        )
+        for _ in range(options['slow'])
+    ]
+    # Медленные клиенты успевают занять соединения первыми.
+    await asyncio.sleep(0.2)
+    fast = await asyncio.gather(*(
+        fast_client(port, paths, random.Random(rng.random()),
+                    options['timeout'], deadline)
+        for _ in range(options['clients'])
+    ))
+    slow_completed = sum(await asyncio.gather(*slow))
+    timings = sorted(t for result in fast for t in result[0])
+    report = {
+        'requests': len(timings),
+        'errors': sum(result[1] for result in fast),
+        'timeouts': sum(result[2] for result in fast),
+        'slow_requests': slow_completed,
+    }
+    if timings:
+        report.update({
+            'per_second': round(len(timings) / options['seconds'], 1),
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        })
+    return report
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Сервер на порту {port} не запустился')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и ASGI (core.asgi) с одинаковым числом потоков: '
+        'быстрые клиенты на фоне медленных соединений, отчёт в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=SERVERS,
+                            default=list(SERVERS))
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков сервера для view.')
+        parser.add_argument('--slow', type=int, default=16,
+                            help='Медленных соединений одновременно.')
+        parser.add_argument('--hold', type=float, default=2,
+                            help='Сколько секунд медленный клиент '
+                                 'досылает запрос.')
+        parser.add_argument('--clients', type=int, default=8,
+                            help='Быстрых клиентов одновременно.')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        # Потоки и процесс сервера открывают свои соединения: база в файле.
+        with override_settings(DEBUG=False), test_database(on_disk=True):
+            seed(options['users'], 10, options['posts'],
+                 seed=options['seed'])
+            report = {
+                'config': {
+                    key: options[key] for key in
+                    ('threads', 'slow', 'hold', 'clients', 'seconds',
+                     'posts')
+                },
+                **{
+                    name: self.run_server(name, self.paths(options),
+                                          options)
+                    for name in options['servers']
+                },
+            }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def paths(self, options):
+        rng = random.Random(options['seed'])
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        usernames = list(User.objects.values_list('username', flat=True))
+        pages = max(1, len(post_ids) // 10)
+        return [reverse('posts:main_page')] + [
+            rng.choice((
+                lambda: f'{reverse("posts:main_page")}'
+                        f'?page={rng.randint(1, pages)}',
+                lambda: reverse('posts:post_detail',
+                                args=[rng.choice(post_ids)]),
+                lambda: reverse('posts:profile',
+                                args=[rng.choice(usernames)]),
+            ))()
+            for _ in range(200)
+        ]
+
+    def run_server(self, name, paths, options):
+        port = free_port()
+        # Сервер в отдельном процессе, чтобы клиенты не делили с ним GIL.
+        connections.close_all()
+        process = multiprocessing.get_context('fork').Process(
+            target=SERVERS[name], args=[port, options['threads']],
+            daemon=True,
+        )
+        process.start()
+        try:
+            wait_for_port(port)
+            return asyncio.run(run_load(port, paths, options))
+        finally:
+            process.terminate()
+            process.join()
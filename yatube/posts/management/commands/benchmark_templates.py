@@ -0,0 +1,126 @@
+import copy
+import json
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from core.template.warmup import warm_templates
+from posts.management.commands.benchmark_posts import (
+    percentile, test_database
+)
+from posts.models import Group, Post, User
+from posts.seeding import seed
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+def templates_setting(cached):
+    """TEMPLATES из настроек, при cached=False — без кеширующего загрузчика."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    if not cached:
+        for backend in templates:
+            loaders = backend['OPTIONS'].get('loaders', [])
+            backend['OPTIONS']['loaders'] = [
+                inner
+                for loader in loaders
+                for inner in (
+                    loader[1] if loader[0] == CACHED_LOADER else [loader]
+                )
+            ]
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает первый запрос и установившийся рендер страниц без '
+        'кеша шаблонов, с кешем и с прогревом warm_templates (JSON).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на страницу в установившемся '
+                                 'режиме.')
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        with override_settings(DEBUG=False), test_database():
+            seed(50, 10, options['posts'], seed=options['seed'])
+            pages = self.pages(options)
+            report = {
+                'config': {key: options[key]
+                           for key in ('requests', 'posts')},
+                **{
+                    mode: self.run_mode(mode, pages, options)
+                    for mode in ('uncached', 'cached', 'warmed')
+                },
+            }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def pages(self, options):
+        rng = random.Random(options['seed'])
+        return {
+            'posts:main_page': reverse('posts:main_page'),
+            'posts:group_list': reverse('posts:group_list', args=[
+                rng.choice(Group.objects.values_list('slug', flat=True))
+            ]),
+            'posts:profile': reverse('posts:profile', args=[
+                rng.choice(User.objects.values_list('username', flat=True))
+            ]),
+            'posts:post_detail': reverse('posts:post_detail', args=[
+                rng.choice(Post.objects.values_list('pk', flat=True))
+            ]),
+        }
+
+    def run_mode(self, mode, pages, options):
+        client = Client()
+        templates = templates_setting(cached=mode != 'uncached')
+        with override_settings(TEMPLATES=templates):
+            started = time.perf_counter()
+            if mode == 'warmed':
+                warm_templates()
+            warm_ms = (time.perf_counter() - started) * 1000
+            first = {
+                name: self.measure(client, path, 1)
+                for name, path in pages.items()
+            }
+            steady = {
+                name: self.measure(client, path, options['requests'])
+                for name, path in pages.items()
+            }
+        return {
+            'warm_ms': round(warm_ms, 3),
+            'first_request': first,
+            'steady': steady,
+        }
+
+    @staticmethod
+    def measure(client, path, requests):
+        """Время запроса и рендера шаблонов; кеш лент чистится каждый раз."""
+        registry.clear()
+        timings = []
+        for _ in range(requests):
+            cache.clear()
+            started = time.perf_counter()
+            client.get(path)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        render_seconds = sum(
+            histogram.sum
+            for histogram in registry.histograms['template_seconds'].values()
+        )
+        return {
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'render_ms': round(render_seconds / requests * 1000, 3),
+        }
@@ -0,0 +1,58 @@
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (
+    Checkpoint, ImportConflict, guess_format, import_posts
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_posts пачками bulk_create '
+        'с контрольными точками для --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument('--format', choices=('ndjson', 'csv'),
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Записей в одной транзакции.')
+        parser.add_argument('--checkpoint',
+                            help='Файл контрольной точки '
+                                 '(по умолчанию <path>.checkpoint).')
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить с контрольной точки.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        path = options['path']
+        try:
+            records, skipped = import_posts(
+                path,
+                guess_format(path, options['format']),
+                Checkpoint(options['checkpoint'] or f'{path}.checkpoint'),
+                batch_size=options['batch_size'],
+                resume=options['resume'],
+                progress=lambda done: self.stdout.write(f'Записей: {done}'),
+            )
+        except ImportConflict as error:
+            raise CommandError(f'Загрузка остановлена: {error}')
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Битая выгрузка: {error}')
+        finally:
+            # Пачки до ошибки уже закоммичены: без пересчёта их посты
+            # остались бы без счётчиков и вне поиска.
+            call_command('rebuild_post_counters', stdout=StringIO())
+            call_command('rebuild_search_index', stdout=StringIO())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {records} записей за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено уже загруженных записей: {skipped}'
+            ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.tasks import make_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Ставит в очередь миниатюры картинок всех постов, например после '
+        'добавления размера в THUMBNAIL_SIZES; с --now делает их сразу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true',
+                            help='Без воркера, в этом процессе.')
+
+    def handle(self, *args, **options):
+        post_ids = list(Post.objects.exclude(image='').values_list(
+            'pk', flat=True
+        ))
+        if options['now']:
+            make_thumbnails([{'post_id': post_id} for post_id in post_ids])
+        else:
+            for post_id in post_ids:
+                make_thumbnails.delay(post_id=post_id)
+        self.stdout.write(f'Постов с картинками: {len(post_ids)}')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Group, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп по таблице постов.'
+
+    def handle(self, *args, **options):
+        group_total = Post.objects.filter(group=OuterRef('pk')).order_by(
+        ).values('group').annotate(total=Count('pk')).values('total')
+        with transaction.atomic():
+            AuthorStats.objects.all().delete()
+            AuthorStats.objects.bulk_create(
+                AuthorStats(author_id=row['author'],
+                            posts_count=row['total'])
+                for row in Post.objects.order_by().values('author').annotate(
+                    total=Count('pk')
+                )
+            )
+            groups = Group.objects.update(posts_count=Coalesce(
+                Subquery(group_total, output_field=IntegerField()), 0
+            ))
+        self.stdout.write(
+            f'Авторов: {AuthorStats.objects.count()}, групп: {groups}'
+        )
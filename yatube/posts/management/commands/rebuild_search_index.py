@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по таблице постов.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(f'Индекс: {type(backend).__name__}')
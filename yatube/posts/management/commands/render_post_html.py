@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, render_text
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет сохранённый HTML текста у постов, где его ещё нет '
+        '(с --all — у всех), пачками по --batch-size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true',
+                            help='Перерендерить и уже заполненные посты, '
+                                 'например после смены render_text.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk')
+        if not options['all']:
+            posts = posts.filter(text_html='')
+        rendered = 0
+        last_pk = 0
+        while True:
+            # Keyset по pk, а не OFFSET: отрендеренные посты выпадают из
+            # выборки без --all, и смещение пропускало бы строки.
+            batch = list(posts.filter(pk__gt=last_pk).only(
+                'id', 'text'
+            )[:options['batch_size']])
+            if not batch:
+                break
+            for post in batch:
+                post.text_html = render_text(post.text)
+            # bulk_update не трогает edited и не шлёт сигналов: видимый
+            # текст не меняется, ленты сбрасывать незачем.
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, ['text_html'])
+            rendered += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(f'Постов: {rendered}')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро заполняет базу пользователями, группами и постами '
+        'для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имён пользователей и слагов групп.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done):
+            self.stdout.write(f'Постов: {done}/{options["posts"]}')
+
+        try:
+            seed(options['users'], options['groups'], options['posts'],
+                 batch_size=options['batch_size'], seed=options['seed'],
+                 prefix=options['prefix'], days=options['days'],
+                 progress=progress)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # SQLite собран без FTS5: поиск возьмёт индекс в памяти.
+        return
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) SELECT id, text FROM posts_post'
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_edited'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
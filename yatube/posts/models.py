@@ -1,15 +1,36 @@
+from collections import Counter
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
+
+from .cache import ALL, invalidate_feeds, post_feeds
 
 
 User = get_user_model()
 
+# Поля, которые шаблоны лент реально читают: всё остальное откладываем.
+FEED_FIELDS = (
+    'id', 'text', 'text_html', 'image', 'pub_date', 'author', 'group',
+    'author__id', 'author__username',
+    'author__first_name', 'author__last_name',
+    'group__id', 'group__slug',
+)
+
 
 class Group(models.Model):
 
     title = models.CharField(verbose_name='Заголовок', max_length=200)
     slug = models.SlugField(verbose_name='Уникальное название', unique=True)
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False
+    )
 
     class Meta():
         verbose_name = 'Группа'
@@ -19,12 +40,158 @@ class Group(models.Model):
         return self.title
 
 
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0
+    )
+
+    class Meta():
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+def shifted(field, delta):
+    """F(field) + delta, но не меньше нуля.
+
+    Счётчик мог разойтись с таблицей (QuerySet.update, bulk_create с
+    counters=False, оборванная загрузка), и уход ниже нуля нарушил бы
+    CHECK положительного поля: удалить пост стало бы нельзя.
+    """
+    return Greatest(F(field) + delta, Value(0))
+
+
+def add_to_author_stats(author_id, field, delta):
+    """Сдвигает счётчик автора, заводя строку статистики при первом посте.
+
+    Строку может одновременно завести другой запрос: get_or_create
+    переживает IntegrityError гонки, а сдвиг тогда повторяется.
+    """
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if stats.update(**{field: shifted(field, delta)}) or delta <= 0:
+        return
+    _, created = AuthorStats.objects.get_or_create(
+        author_id=author_id, defaults={field: delta}
+    )
+    if not created:
+        stats.update(**{field: shifted(field, delta)})
+
+
+def update_post_counters(author_ids=(), group_ids=(), delta=1):
+    """Сдвигает счётчики постов авторов и групп на delta.
+
+    Вызывается внутри той же транзакции, что и запись поста, поэтому
+    счётчик не расходится с таблицей постов при откате.
+    """
+    for author_id, times in Counter(author_ids).items():
+        add_to_author_stats(author_id, 'posts_count', delta * times)
+    for group_id, times in Counter(filter(None, group_ids)).items():
+        Group.objects.filter(pk=group_id).update(
+            posts_count=shifted('posts_count', delta * times)
+        )
+
+
+def update_followers_count(author_id, delta):
+    add_to_author_stats(author_id, 'followers_count', delta)
+
+
+def render_text(text):
+    """HTML текста поста: абзацы и переносы строк, остальное экранировано."""
+    return linebreaks(text, autoescape=True)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """Подтягивает автора и группу одним JOIN вместо запроса на строку."""
+        return self.select_related('author', 'group')
+
+    def for_feed(self):
+        """Queryset для лент: JOIN-ы заранее, лишние колонки отложены."""
+        return self.with_related().only(*FEED_FIELDS)
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False,
+                    counters=True, keep_dates=False):
+        # counters=False для массовой загрузки: счётчики потом пересчитает
+        # rebuild_post_counters. keep_dates=True записывает pub_date и
+        # edited самих объектов, а не текущее время.
+        objs = list(objs)
+        for post in objs:
+            post.text_html = render_text(post.text)
+        with transaction.atomic(using=self.db):
+            if keep_dates:
+                self._insert_keeping_dates(objs, batch_size,
+                                           ignore_conflicts)
+            else:
+                objs = super().bulk_create(objs, batch_size,
+                                           ignore_conflicts)
+            if counters:
+                update_post_counters(
+                    [post.author_id for post in objs],
+                    [post.group_id for post in objs],
+                )
+        # bulk_create не шлёт сигналов, поэтому сбрасываем все ленты.
+        invalidate_feeds(ALL)
+        return objs
+
+    def _insert_keeping_dates(self, objs, batch_size, ignore_conflicts):
+        """INSERT пачками в raw-режиме, как у loaddata.
+
+        В нём pre_save полей не вызывается, и auto_now_add с auto_now не
+        подменяют даты. Сами поля модели общие для всех потоков, поэтому
+        их флаги не трогаем.
+        """
+        meta = self.model._meta
+        ops = connections[self.db].ops
+        with_pk = [obj for obj in objs if obj.pk is not None]
+        without_pk = [obj for obj in objs if obj.pk is None]
+        for rows, fields in (
+            (with_pk, meta.concrete_fields),
+            (without_pk, [f for f in meta.concrete_fields
+                          if not f.primary_key]),
+        ):
+            size = max(ops.bulk_batch_size(fields, rows), 1)
+            if batch_size:
+                size = min(size, batch_size)
+            for start in range(0, len(rows), size):
+                self._insert(rows[start:start + size], fields=fields,
+                             using=self.db, raw=True,
+                             ignore_conflicts=ignore_conflicts)
+        for obj in objs:
+            obj._state.adding = False
+            obj._state.db = self.db
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста')
+    # Текст, один раз отрендеренный при сохранении, а не на каждый показ.
+    text_html = models.TextField(
+        verbose_name='HTML текста поста',
+        blank=True,
+        editable=False
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    edited = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,16 +206,131 @@ class Post(models.Model):
         related_name='posts',
         verbose_name='Группа'
     )
-    # image = models.ImageField(
-    #     'Image',
-    #     upload_to='posts/',
-    #     blank=True
-    # )
+    image = models.ImageField(
+        verbose_name='Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta():
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # По индексу на каждую ленту из views: общая, группы и автора.
+        indexes = (
+            models.Index(fields=('pub_date', 'id'),
+                         name='post_feed_idx'),
+            models.Index(fields=('group', 'pub_date', 'id'),
+                         name='post_group_feed_idx'),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='post_author_feed_idx'),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
+
+    @property
+    def html(self):
+        # Пока render_post_html не прошёл по старым постам, рендерим здесь.
+        return mark_safe(self.text_html or render_text(self.text))
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.text_html = render_text(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'text_html'}
+        # Ленты, где пост был до сохранения: при переносе сбрасываются и
+        # они (posts.signals).
+        self.feeds_before = []
+        with transaction.atomic():
+            if not adding:
+                old_author_id, old_group_id, username, slug = (
+                    Post.objects.filter(pk=self.pk).values_list(
+                        'author_id', 'group_id',
+                        'author__username', 'group__slug',
+                    ).first() or (None, None, None, None)
+                )
+                if old_author_id is not None:
+                    self.feeds_before = post_feeds(username, slug)
+            super().save(*args, **kwargs)
+            if adding:
+                update_post_counters([self.author_id], [self.group_id])
+                return
+            # Пост можно перенести и к другому автору, например в админке.
+            if old_author_id != self.author_id:
+                update_post_counters(author_ids=[old_author_id], delta=-1)
+                update_post_counters(author_ids=[self.author_id])
+            if old_group_id != self.group_id:
+                update_post_counters(group_ids=[old_group_id], delta=-1)
+                update_post_counters(group_ids=[self.group_id])
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta():
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~Q(user=F('author')),
+                                   name='no_self_follow'),
+        )
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в готовой ленте подписок пользователя (fan-out on write).
+
+    pub_date и author скопированы из поста, чтобы страница ленты читалась
+    одним диапазоном индекса (user, pub_date, id) без JOIN для сортировки.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta():
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(fields=('user', 'pub_date', 'post'),
+                         name='timeline_feed_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_entry'),
+        )
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
@@ -0,0 +1,234 @@
+import base64
+import binascii
+import hashlib
+
+from django.core.cache import caches
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from posts.settings import (
+    FEED_COUNT_CACHE, FEED_COUNT_TIMEOUT, PAGE_WINDOW_ENDS, PAGE_WINDOW_SIDE
+)
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def page_window(number, num_pages, on_each_side=PAGE_WINDOW_SIDE,
+                on_ends=PAGE_WINDOW_ENDS):
+    """Номера страниц вокруг текущей; None — место для многоточия.
+
+    Для 10 000 страниц вместо 10 000 ссылок получаем что-то вроде
+    1 … 48 49 50 51 52 … 10000.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    # Многоточие ставим, только если оно скрывает хотя бы две страницы.
+    if number > on_each_side + on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+        window.extend(range(number - on_each_side, number + 1))
+    else:
+        window.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window.extend(range(number + 1, number + on_each_side + 1))
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(number + 1, num_pages + 1))
+    return window
+
+
+class FeedPage(Page):
+
+    @cached_property
+    def page_window(self):
+        return page_window(self.number, self.paginator.num_pages)
+
+
+class FeedPaginator(Paginator):
+    """Paginator с ограниченной навигацией и необязательным оценочным count.
+
+    count можно передать готовым (например, из счётчика), а при
+    estimate=True точный COUNT(*) выполняется не чаще раза в
+    FEED_COUNT_TIMEOUT секунд для одного и того же запроса. Строки
+    страницы можно выбрать заранее через prefetch(), не дожидаясь count.
+    """
+
+    def __init__(self, object_list, per_page, count=None, estimate=False,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.estimate = estimate
+        self.prefetched = {}
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if not self.estimate:
+            return super().count
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return caches[FEED_COUNT_CACHE].get_or_set(
+            f'posts:count:{digest}',
+            lambda: self.object_list.count(),
+            FEED_COUNT_TIMEOUT,
+        )
+
+    def prefetch(self, number):
+        """Выбирает строки страницы, не зная числа постов.
+
+        Номер здесь проверяется только на формат; page() возьмёт эти
+        строки, если номер окажется в пределах ленты.
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        bottom = (number - 1) * self.per_page
+        self.prefetched[number] = list(
+            self.object_list[bottom:bottom + self.per_page + self.orphans]
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        rows = self.prefetched.get(number)
+        if rows is None:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return self._get_page(rows[:top - bottom], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+
+class CursorPage:
+    """Страница ленты, адресуемая курсором вместо номера."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) от новых записей к старым.
+
+    Вместо COUNT(*) и OFFSET каждая страница — это диапазонный запрос
+    от ключа последней показанной записи, поэтому глубина листания
+    не влияет на стоимость запроса.
+    """
+
+    def __init__(self, queryset, per_page, date_field='pub_date',
+                 id_field='pk'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.date_field = date_field
+        # Второй ключ сортировки: у записей ленты подписок это post_id.
+        self.id_field = id_field
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу; битый курсор ведёт на первую страницу."""
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            direction, date, pk = NEXT, None, None
+        else:
+            direction, date, pk = position
+        rows = self._fetch(direction, date, pk)
+        has_more = len(rows) > self.per_page
+        if direction == PREVIOUS and not has_more:
+            # Дошли до самых новых записей: это просто первая страница.
+            return self.get_page()
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+        if not rows:
+            return CursorPage([])
+        first, last = rows[0], rows[-1]
+        older = has_more if direction == NEXT else True
+        newer = position is not None
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(NEXT, last) if older else None,
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, first) if newer else None
+            ),
+        )
+
+    def _fetch(self, direction, date, pk):
+        return list(self.rows_from(direction, date, pk)[:self.per_page + 1])
+
+    def rows_from(self, direction, date, pk):
+        """Строки после ключа (date, pk) в порядке обхода, без LIMIT."""
+        field, id_field = self.date_field, self.id_field
+        queryset = self.queryset
+        if direction == NEXT:
+            if date is not None:
+                # Отдельное условие на дату даёт индексу диапазон для поиска:
+                # одно OR-условие SQLite проверил бы для каждой строки.
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lte': date}),
+                    Q(**{f'{field}__lt': date}) | Q(**{f'{id_field}__lt': pk}),
+                )
+            queryset = queryset.order_by(f'-{field}', f'-{id_field}')
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{field}__gte': date}),
+                Q(**{f'{field}__gt': date}) | Q(**{f'{id_field}__gt': pk}),
+            ).order_by(field, id_field)
+        return queryset
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            if self.id_field == 'pk':
+                return row[self.date_field], row.get('pk', row.get('id'))
+            return row[self.date_field], row[self.id_field]
+        return getattr(row, self.date_field), getattr(row, self.id_field)
+
+    def encode_cursor(self, direction, row):
+        date, pk = self._key(row)
+        raw = f'{direction}|{date.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, date, pk = raw.decode().split('|')
+            date = parse_datetime(date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if direction not in (NEXT, PREVIOUS) or date is None:
+            return None
+        return direction, date, pk
@@ -0,0 +1,260 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite с FTS5 тексты постов дублируются в виртуальную таблицу
+posts_post_fts, и поиск с ранжированием по bm25 идёт по её индексу.
+Если FTS5 нет, работает инвертированный индекс в памяти процесса.
+Таблицу FTS5 обновляет фоновая задача posts.tasks.index_posts, а индекс в
+памяти — сразу сигнал (posts.signals): воркер живёт в другом процессе.
+bulk_create сигналов не шлёт, после массовой загрузки нужен
+rebuild_search_index.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from posts.settings import SEARCH_FALLBACK_LIMIT
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+def terms(text):
+    return WORD.findall(text.lower())
+
+
+_fts5_databases = {}
+
+
+def fts5_available():
+    """Есть ли в текущей базе таблица FTS5 (её создаёт миграция)."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_databases:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = %s",
+                [FTS_TABLE],
+            )
+            _fts5_databases[name] = cursor.fetchone() is not None
+    return _fts5_databases[name]
+
+
+class MatchedIds(RawSQL):
+    """Подзапрос rowid из FTS5 для pk__in.
+
+    RawSQL сам берёт SQL в скобки, а lookup добавляет вторые, и SQLite
+    понял бы ((SELECT ...)) как скалярный подзапрос с одной первой
+    строкой. Здесь скобки ставит только lookup.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+class Fts5Backend:
+    """Поиск через теневую виртуальную таблицу FTS5."""
+
+    # Индекс в базе: его может обновлять воркер.
+    shared = True
+
+    def match(self, query):
+        # Каждое слово — отдельная фраза в кавычках: пользовательский ввод
+        # не должен разбираться как синтаксис FTS5.
+        return ' '.join(f'"{term}"' for term in terms(query))
+
+    def index(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post_id, text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def count(self, query):
+        if not terms(query):
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match(query)],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        if not terms(query):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [self.match(query), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        if not terms(query):
+            return queryset.none()
+        return queryset.filter(pk__in=MatchedIds(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self.match(query)],
+        ))
+
+
+class InvertedIndexBackend:
+    """Инвертированный индекс в памяти с ранжированием BM25.
+
+    Строится при первом поиске одним проходом по таблице. Индекс свой у
+    каждого процесса и видит только правки, сделанные в этом процессе.
+    """
+
+    shared = False
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built = False
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        # Сумма lengths: средняя длина нужна каждому запросу.
+        self.total_length = 0
+        self.documents = {}
+
+    def _add(self, post_id, text):
+        frequencies = Counter(terms(text))
+        self.lengths[post_id] = sum(frequencies.values())
+        self.total_length += self.lengths[post_id]
+        self.documents[post_id] = tuple(frequencies)
+        for term, frequency in frequencies.items():
+            self.postings[term][post_id] = frequency
+
+    def _discard(self, post_id):
+        self.total_length -= self.lengths.pop(post_id, 0)
+        for term in self.documents.pop(post_id, ()):
+            posting = self.postings[term]
+            posting.pop(post_id, None)
+            if not posting:
+                del self.postings[term]
+
+    def _ensure_built(self):
+        if self.built:
+            return
+        with self.lock:
+            if not self.built:
+                rows = Post.objects.values_list('id', 'text').iterator(
+                    chunk_size=2000
+                )
+                for post_id, text in rows:
+                    self._add(post_id, text)
+                self.built = True
+
+    def index(self, post_id, text):
+        if self.built:
+            with self.lock:
+                self._discard(post_id)
+                self._add(post_id, text)
+
+    def remove(self, post_id):
+        if self.built:
+            with self.lock:
+                self._discard(post_id)
+
+    def rebuild(self):
+        with self.lock:
+            self.built = False
+            self.postings.clear()
+            self.lengths.clear()
+            self.total_length = 0
+            self.documents.clear()
+        self._ensure_built()
+
+    def ranked(self, query):
+        self._ensure_built()
+        words = set(terms(query))
+        with self.lock:
+            postings = [self.postings.get(term, {}) for term in words]
+            if not postings or not all(postings):
+                return []
+            total = len(self.lengths)
+            average = self.total_length / total
+            matches = set.intersection(*(set(p) for p in postings))
+            scores = []
+            for post_id in matches:
+                score = 0
+                length = self.lengths[post_id]
+                norm = self.k1 * (1 - self.b + self.b * length / average)
+                for posting in postings:
+                    frequency = posting[post_id]
+                    found = len(posting)
+                    idf = math.log(1 + (total - found + 0.5) / (found + 0.5))
+                    score += idf * frequency * (self.k1 + 1) / (
+                        frequency + norm
+                    )
+                scores.append((-score, -post_id))
+        return [-post_id for _, post_id in sorted(scores)]
+
+    def count(self, query):
+        return len(self.ranked(query))
+
+    def ranked_ids(self, query, offset, limit):
+        return self.ranked(query)[offset:offset + limit]
+
+    def filter(self, queryset, query):
+        return queryset.filter(
+            pk__in=self.ranked(query)[:SEARCH_FALLBACK_LIMIT]
+        )
+
+
+_fallback = InvertedIndexBackend()
+
+
+def get_backend():
+    return Fts5Backend() if fts5_available() else _fallback
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности, для Paginator."""
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+
+    def count(self):
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        ids = self.backend.ranked_ids(
+            self.query, offset, index.stop - offset
+        )
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
@@ -0,0 +1,131 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from core.utils import batched
+from .models import Group, Post, User
+
+FIRST_NAMES = (
+    'Анна', 'Борис', 'Вера', 'Глеб', 'Дарья', 'Егор', 'Жанна', 'Захар',
+    'Ирина', 'Кирилл', 'Лидия', 'Максим', 'Нина', 'Олег', 'Полина', 'Роман',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков',
+)
+WORDS = (
+    'сегодня', 'вчера', 'город', 'книга', 'дорога', 'море', 'утро', 'вечер',
+    'работа', 'друзья', 'музыка', 'кино', 'погода', 'проект', 'идея', 'код',
+    'python', 'django', 'лента', 'пост', 'фото', 'кофе', 'лес', 'река',
+    'прочитал', 'написал', 'увидел', 'решил', 'понравилось', 'интересно',
+    'очень', 'снова', 'наконец', 'почему', 'когда', 'всегда', 'никогда',
+)
+# Доля постов без группы и крутизна распределения по авторам и группам:
+# немногие пишут много, большинство — мало.
+NO_GROUP_SHARE = 0.3
+ZIPF_EXPONENT = 1.1
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+# Сколько ключей за раз уходит в IN (...): у SQLite предел 999 параметров.
+LOOKUP_SIZE = 500
+
+
+def zipf_weights(count):
+    return list(itertools.accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)
+    ))
+
+
+def ensure_rows(model, field, objs, batch_size):
+    """Создаёт объекты, которых ещё нет, и возвращает id всех по порядку.
+
+    Объект ищется по уникальному field: строки прошлого запуска с тем же
+    префиксом переиспользуются, а не падают на IntegrityError, и чужие
+    строки с похожими именами не подхватываются.
+    """
+    ids = []
+    for batch in batched(objs, min(batch_size, LOOKUP_SIZE)):
+        keys = [getattr(obj, field) for obj in batch]
+        rows = model.objects.filter(**{f'{field}__in': keys})
+        existing = set(rows.values_list(field, flat=True))
+        model.objects.bulk_create(
+            [obj for obj in batch if getattr(obj, field) not in existing]
+        )
+        found = dict(rows.values_list(field, 'pk'))
+        ids.extend(found[key] for key in keys)
+    return ids
+
+
+def random_text(rng):
+    length = max(3, int(rng.lognormvariate(3, 0.8)))
+    return ' '.join(rng.choices(WORDS, k=length)).capitalize()
+
+
+def seed(users, groups, posts, batch_size=10000, seed=0, prefix='seed',
+         start=START, days=365, progress=None):
+    """Заполняет базу авторами, группами и постами пачками bulk_create.
+
+    Одинаковые аргументы дают одинаковые данные. Каждая пачка пишется в
+    своей транзакции, в памяти одновременно держится не больше
+    batch_size объектов. Повторный запуск с тем же префиксом досоздаёт
+    только недостающее, так что прерванное заполнение можно повторить.
+    Счётчики пересчитываются один раз в конце.
+    """
+    if min(users, groups, posts) < 0 or batch_size < 1:
+        raise ValueError('Числа должны быть неотрицательными, '
+                         'а размер пачки — положительным')
+    if posts and not users:
+        raise ValueError('Для постов нужен хотя бы один автор')
+    rng = random.Random(seed)
+    password = make_password(None)
+    author_ids = ensure_rows(User, 'username', (
+        User(username=f'{prefix}{i}', password=password,
+             first_name=rng.choice(FIRST_NAMES),
+             last_name=rng.choice(LAST_NAMES))
+        for i in range(users)
+    ), batch_size)
+    group_ids = ensure_rows(Group, 'slug', (
+        Group(title=f'Группа {prefix} {i}', slug=f'{prefix}-group-{i}',
+              description=random_text(rng))
+        for i in range(groups)
+    ), batch_size)
+    author_weights = zipf_weights(len(author_ids))
+    group_weights = zipf_weights(len(group_ids))
+    step = timedelta(days=days) / max(posts, 1)
+
+    def new_posts():
+        for i in range(posts):
+            group_id = None
+            if group_ids and rng.random() >= NO_GROUP_SHARE:
+                group_id = rng.choices(group_ids, cum_weights=group_weights)[0]
+            pub_date = start + step * i
+            yield Post(
+                text=random_text(rng),
+                author_id=rng.choices(author_ids,
+                                      cum_weights=author_weights)[0],
+                group_id=group_id,
+                pub_date=pub_date,
+                edited=pub_date,
+            )
+
+    # Пачки пишутся по порядку и целиком, так что посты прошлого запуска —
+    # это начало той же последовательности: её пропускаем, но генерируем,
+    # чтобы rng дошёл до того же состояния.
+    done = sum(
+        Post.objects.filter(author_id__in=chunk).count()
+        for chunk in batched(author_ids, LOOKUP_SIZE)
+    )
+    remaining = itertools.islice(new_posts(), done, None)
+    for batch in batched(remaining, batch_size):
+        with transaction.atomic():
+            Post.objects.bulk_create(batch, counters=False, keep_dates=True)
+        done += len(batch)
+        if progress:
+            progress(done)
+    call_command('rebuild_post_counters', stdout=StringIO())
+    call_command('rebuild_search_index', stdout=StringIO())
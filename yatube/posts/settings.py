@@ -1,2 +1,32 @@
 POSTS_PER_PAGE = 10
 POSTS_SECOND_PAGE = 3
+# 'page' — нумерованные страницы, 'cursor' — keyset-пагинация по ?cursor=.
+FEED_PAGINATION = 'page'
+# Навигация: сколько соседних страниц и сколько крайних показывать.
+PAGE_WINDOW_SIDE = 2
+PAGE_WINDOW_ENDS = 1
+# 'exact' — COUNT(*) на каждый запрос, 'estimated' — кешированный count.
+FEED_COUNT_MODE = 'exact'
+FEED_COUNT_CACHE = 'default'
+FEED_COUNT_TIMEOUT = 60
+# Алиас из CACHES для страниц лент и время жизни страницы в секундах.
+FEED_CACHE = 'default'
+FEED_CACHE_TIMEOUT = 300
+# Сколько лучших совпадений отдаёт запасной поиск в фильтр админки.
+SEARCH_FALLBACK_LIMIT = 1000
+# Посты авторов, у которых подписчиков не меньше этого числа, не
+# раскладываются по лентам, а подмешиваются при чтении.
+FANOUT_FOLLOWER_LIMIT = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 100
+# JSON API: размер страницы по умолчанию и предел для ?limit=.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 500
+# Сколько последних постов попадает в RSS и Atom.
+SYNDICATION_ITEMS = 20
+# Миниатюры картинок постов: имя — (геометрия sorl, опции). Их заранее
+# готовит воркер (posts.tasks.make_thumbnails), а не первый просмотр.
+THUMBNAIL_SIZES = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960', {'upscale': False}),
+}
@@ -0,0 +1,149 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (
+    ALL, group_scope, invalidate_feeds, post_feeds, profile_scope
+)
+from .models import (
+    Follow, Group, Post, User, update_followers_count, update_post_counters
+)
+from .search import get_backend
+from .tasks import (
+    backfill_timeline, fan_out_post, index_posts, make_thumbnails,
+    refill_timelines
+)
+from .timeline import drop, dropped_below_limit
+
+
+@receiver(post_delete, sender=Post)
+def decrease_post_counters(sender, instance, **kwargs):
+    # Удаление идёт в транзакции Collector, так что счётчик откатится вместе
+    # с постом.
+    update_post_counters([instance.author_id], [instance.group_id], delta=-1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    group = instance.group if instance.group_id else None
+    invalidate_feeds(
+        *post_feeds(instance.author.username, group and group.slug),
+        *getattr(instance, 'feeds_before', ()),
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance.slug_before = Group.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True
+    ).first() if instance.pk is not None else None
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance.slug_before not in (None, instance.slug):
+        # Слаг группы выводится в ссылках каждой ленты.
+        invalidate_feeds(ALL)
+    else:
+        invalidate_feeds(group_scope(instance.slug))
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group_feeds(sender, instance, **kwargs):
+    invalidate_feeds(ALL)
+
+
+# Поля автора, которые выводятся в лентах, на странице поста и в RSS.
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def displays_user(update_fields):
+    return update_fields is None or not set(update_fields).isdisjoint(
+        DISPLAYED_USER_FIELDS
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_displayed_user(sender, instance, update_fields=None,
+                            **kwargs):
+    # Вход сохраняет только last_login: лишний запрос ему не нужен.
+    instance.displayed_before = None
+    if instance.pk is not None and displays_user(update_fields):
+        instance.displayed_before = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*DISPLAYED_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_author_feeds(sender, instance, created, **kwargs):
+    before = getattr(instance, 'displayed_before', None)
+    if created or before is None:
+        return
+    if before == tuple(getattr(instance, field)
+                       for field in DISPLAYED_USER_FIELDS):
+        return
+    if Post.objects.filter(author=instance).exists():
+        # Имя автора есть в любой ленте с его постами, а username — в
+        # ссылках; сдвиг общей версии обновляет и ETag страниц постов.
+        invalidate_feeds(ALL)
+    else:
+        invalidate_feeds(profile_scope(before[0]),
+                         profile_scope(instance.username))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    backend = get_backend()
+    if backend.shared:
+        index_posts.delay(post_id=instance.pk)
+    elif kwargs['signal'] is post_save:
+        backend.index(instance.pk, instance.text)
+    else:
+        backend.remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        fan_out_post.delay(post_id=instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def thumbnail_post_image(sender, instance, **kwargs):
+    # Готовые миниатюры задача не переделывает, так что правка текста
+    # поста с картинкой обходится пустым проходом воркера.
+    if instance.image:
+        make_thumbnails.delay(post_id=instance.pk)
+
+
+def invalidate_follow_button(author_id):
+    # Кнопка подписки в профиле входит в ETag через версию ленты автора.
+    # При удалении автора подписки удаляются каскадом уже без него.
+    username = User.objects.filter(pk=author_id).values_list(
+        'username', flat=True
+    ).first()
+    if username is not None:
+        invalidate_feeds(profile_scope(username))
+
+
+@receiver(post_save, sender=Follow)
+def follow_author(sender, instance, created, **kwargs):
+    if not created:
+        return
+    update_followers_count(instance.author_id, 1)
+    backfill_timeline.delay(user_id=instance.user_id,
+                            author_id=instance.author_id)
+    invalidate_follow_button(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_author(sender, instance, **kwargs):
+    update_followers_count(instance.author_id, -1)
+    drop(instance.user_id, instance.author_id)
+    if dropped_below_limit(instance.author_id):
+        # Пока автор был выше порога, его посты не раскладывались.
+        refill_timelines.delay(author_id=instance.author_id)
+    invalidate_follow_button(instance.author_id)
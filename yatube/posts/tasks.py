@@ -0,0 +1,69 @@
+"""Фоновые задачи, которые ставят сигналы записи постов и подписок.
+
+В запросе остаются только то, что должно измениться вместе с постом:
+счётчики (в той же транзакции) и версии кешей лент (иначе автор не
+увидит своей правки). Поисковый индекс, раскладка по лентам подписчиков
+и миниатюры картинок делаются воркером и читают актуальное состояние
+базы на момент выполнения, так что повтор или устаревшая задача ничего
+не ломают. Версии лент, которые сдвигает воркер, видны веб-процессам,
+только если FEED_CACHE общий для всех процессов (проверка posts.W001
+в manage.py check --deploy).
+"""
+from core.jobs import task
+
+from .cache import invalidate_feeds, post_feeds
+from .models import Follow, Post
+from .search import get_backend
+from .thumbnails import generate
+from .timeline import backfill, fan_out, refill
+
+
+@task(batch=True)
+def index_posts(payloads):
+    post_ids = {payload['post_id'] for payload in payloads}
+    texts = dict(
+        Post.objects.filter(pk__in=post_ids).values_list('id', 'text')
+    )
+    backend = get_backend()
+    for post_id in post_ids:
+        if post_id in texts:
+            backend.index(post_id, texts[post_id])
+        else:
+            backend.remove(post_id)
+
+
+@task()
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'author', 'pub_date'
+    ).first()
+    if post is not None:
+        fan_out(post)
+
+
+@task()
+def backfill_timeline(user_id, author_id):
+    # Пока задача ждала, читатель мог уже отписаться.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+
+
+@task()
+def refill_timelines(author_id):
+    refill(author_id)
+
+
+@task(batch=True)
+def make_thumbnails(payloads):
+    posts = Post.objects.filter(
+        pk__in={payload['post_id'] for payload in payloads}
+    ).exclude(image='').values_list('image', 'author__username',
+                                    'group__slug')
+    feeds = set()
+    for image, username, slug in posts:
+        generate(image)
+        feeds.update(post_feeds(username, slug))
+    # Закешированные страницы показывали исходные картинки. С LocMemCache
+    # сдвиг останется в памяти воркера, и страницы веб-процессов
+    # обновятся только через FEED_CACHE_TIMEOUT.
+    invalidate_feeds(*feeds)
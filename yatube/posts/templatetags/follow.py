@@ -0,0 +1,13 @@
+from django import template
+
+from posts.models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    """Подписан ли текущий пользователь на автора."""
+    return Follow.objects.filter(
+        user=context['user'], author_id=author_id
+    ).exists()
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import thumbnail
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(image, size):
+    """Готовая миниатюра картинки поста, пока её нет — сама картинка."""
+    return {'image': image, 'thumbnail': thumbnail(image, size)}
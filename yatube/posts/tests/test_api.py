@@ -0,0 +1,158 @@
+import json
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.commit import on_commit_callbacks
+from posts.models import Group, Post, User
+
+API_INDEX = reverse('posts:api_index')
+API_GROUP = reverse('posts:api_group', args=['test_slug'])
+API_PROFILE = reverse('posts:api_profile', args=['SomeUsername'])
+API_MISSING = (
+    reverse('posts:api_group', args=['missing']),
+    reverse('posts:api_profile', args=['Missing']),
+    reverse('posts:api_post', args=[0]),
+)
+FIELDS = {'id', 'text', 'pub_date', 'author', 'group'}
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.another_user = User.objects.create(username='AnotherUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.user, group=cls.group)
+            for i in range(25)
+        )
+        Post.objects.create(text='Чужой пост', author=cls.another_user)
+        cls.guest = Client()
+
+    def get_json(self, url, **params):
+        response = self.guest.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        content = (b''.join(response.streaming_content)
+                   if response.streaming else response.content)
+        return json.loads(content)
+
+    def walk(self, url, **params):
+        pages = [self.get_json(url, **params)]
+        while pages[-1]['next']:
+            pages.append(
+                self.get_json(url, cursor=pages[-1]['next'], **params)
+            )
+        return pages
+
+    def test_feeds_walk_all_posts(self):
+        '''Following next cursors visits every post of a feed once.'''
+        for url, total in ((API_INDEX, 26), (API_GROUP, 25),
+                           (API_PROFILE, 25)):
+            with self.subTest(url=url):
+                pages = self.walk(url, limit=10)
+                posts = [post for page in pages for post in page['results']]
+                self.assertEqual(len(posts), total)
+                self.assertEqual(len({post['id'] for post in posts}), total)
+                self.assertEqual(
+                    posts,
+                    sorted(posts, key=lambda post: (post['pub_date'],
+                                                    post['id']),
+                           reverse=True)
+                )
+                self.assertEqual(set(posts[0]), FIELDS)
+
+    def test_previous_cursor(self):
+        '''The previous cursor leads back to the page before.'''
+        first = self.get_json(API_INDEX, limit=10)
+        second = self.get_json(API_INDEX, limit=10, cursor=first['next'])
+        back = self.get_json(API_INDEX, limit=10, cursor=second['previous'])
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(first['previous'])
+        self.assertIsNone(back['previous'])
+        third = self.get_json(API_INDEX, limit=10, cursor=second['next'])
+        back = self.get_json(API_INDEX, limit=10, cursor=third['previous'])
+        self.assertEqual(back, second)
+
+    def test_limit_is_clamped(self):
+        '''limit falls back to defaults and is capped.'''
+        for limit, size in (('abc', 20), (0, 1), (10 ** 6, 26)):
+            with self.subTest(limit=limit):
+                page = self.get_json(API_INDEX, limit=limit)
+                self.assertEqual(len(page['results']), size)
+
+    def test_post_detail(self):
+        '''Post detail returns the same fixed fields.'''
+        post = Post.objects.filter(author=self.another_user).get()
+        data = self.get_json(reverse('posts:api_post', args=[post.pk]))
+        self.assertEqual(data, {
+            'id': post.pk,
+            'text': 'Чужой пост',
+            'pub_date': post.pub_date.isoformat(),
+            'author': 'AnotherUsername',
+            'group': None,
+        })
+
+    def test_missing_objects(self):
+        '''Unknown groups, authors and posts are JSON 404s.'''
+        for url in API_MISSING:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+
+    def test_one_query_per_feed_page(self):
+        '''A feed page is one query with no per-post queries.'''
+        for url, budget in ((API_INDEX, 1), (API_GROUP, 2),
+                            (API_PROFILE, 2)):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.get_json(url, limit=25)
+                self.assertEqual(len(queries), budget)
+
+    def test_rows_are_read_while_streaming(self):
+        '''The page query runs only when the body is consumed.'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest.get(API_INDEX)
+            self.assertEqual(len(queries), 0)
+            b''.join(response.streaming_content)
+        self.assertEqual(len(queries), 1)
+
+    def test_head_is_allowed(self):
+        '''Feeds and posts answer HEAD as well as GET.'''
+        post = Post.objects.filter(author=self.another_user).get()
+        for url in (API_INDEX, reverse('posts:api_post', args=[post.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest.head(url).status_code, 200)
+
+    def test_etag_ignores_visitor(self):
+        '''ETags do not read the session but do follow limit.'''
+        client = Client()
+        client.force_login(self.user)
+        post = Post.objects.filter(author=self.another_user).get()
+        for url in (API_INDEX, reverse('posts:api_post', args=[post.pk])):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response['ETag'], self.guest.get(url)['ETag'])
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertNotEqual(self.guest.get(API_INDEX, {'limit': 5})['ETag'],
+                            self.guest.get(API_INDEX)['ETag'])
+
+    def test_conditional_get(self):
+        '''Feeds answer If-None-Match with 304 until a post changes.'''
+        etag = self.guest.get(API_INDEX)['ETag']
+        response = self.guest.get(API_INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with on_commit_callbacks():
+            Post.objects.create(text='Новый пост', author=self.user)
+        response = self.guest.get(API_INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
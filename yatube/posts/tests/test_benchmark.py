@@ -0,0 +1,41 @@
+import json
+from contextlib import nullcontext
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.management.commands.benchmark_posts import Command, percentile
+
+
+class BenchmarkPostsTest(TestCase):
+
+    def test_percentile(self):
+        '''Nearest-rank percentile of a sorted list'''
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_requests_must_be_positive(self):
+        '''--requests 0 is rejected before anything runs'''
+        with self.assertRaises(CommandError):
+            call_command('benchmark_posts', requests=0, stdout=StringIO())
+
+    def test_report(self):
+        '''Every scenario is measured on the seeded database'''
+        output = StringIO()
+        # Тестовая база уже есть: вторую команда не создаёт.
+        with mock.patch.object(Command, 'test_database', nullcontext):
+            call_command('benchmark_posts', users=3, groups=2, posts=30,
+                         requests=2, stdout=output)
+        report = json.loads(output.getvalue())
+        self.assertEqual(set(report['views']), {
+            'index', 'group_list', 'profile', 'post_detail', 'post_create',
+            'post_edit',
+        })
+        for name, result in report['views'].items():
+            with self.subTest(view=name):
+                self.assertEqual(result['requests'], 2)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
@@ -0,0 +1,209 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import routers
+from core.tests.commit import on_commit_callbacks
+from posts.cache import INDEX, cache_feed, feed_versions, invalidate_feeds
+from posts.checks import check_feed_cache
+from posts.models import Group, Post, User
+
+MAIN_PAGE = reverse('posts:main_page')
+GROUP_LIST = reverse('posts:group_list', args=['test_slug'])
+ANOTHER_GROUP_LIST = reverse('posts:group_list', args=['another_slug'])
+PROFILE = reverse('posts:profile', args=['SomeUsername'])
+ANOTHER_PROFILE = reverse('posts:profile', args=['SomeAnotherUsername'])
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.another_user = User.objects.create(username='SomeAnotherUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другой заголовок',
+            slug='another_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+        Post.objects.create(
+            text='Другой пост',
+            author=cls.another_user,
+            group=cls.another_group
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, urls, cached=True):
+        for url in urls:
+            with self.subTest(url=url, cached=cached):
+                with CaptureQueriesContext(connection) as queries:
+                    self.guest.get(url)
+                self.assertEqual(len(queries) == 0, cached)
+
+    def warm(self):
+        for url in (MAIN_PAGE, GROUP_LIST, ANOTHER_GROUP_LIST, PROFILE,
+                    ANOTHER_PROFILE):
+            self.guest.get(url)
+
+    def test_pages_are_cached(self):
+        '''Repeated anonymous feed pages skip the database'''
+        self.warm()
+        self.assertCached((MAIN_PAGE, GROUP_LIST, PROFILE))
+        self.assertContains(self.guest.get(MAIN_PAGE), self.post.text)
+
+    def test_new_post_evicts_only_its_feeds(self):
+        '''A new post evicts the feeds it appears in'''
+        self.warm()
+        with on_commit_callbacks():
+            Post.objects.create(
+                text='Свежий пост', author=self.user, group=self.group
+            )
+        self.assertCached((ANOTHER_GROUP_LIST, ANOTHER_PROFILE))
+        self.assertCached((MAIN_PAGE, GROUP_LIST, PROFILE), cached=False)
+        self.assertContains(self.guest.get(MAIN_PAGE), 'Свежий пост')
+
+    def test_moved_post_evicts_old_and_new_group(self):
+        '''Moving a post evicts both groups'''
+        self.warm()
+        self.post.group = self.another_group
+        with on_commit_callbacks():
+            self.post.save()
+        self.assertCached((ANOTHER_PROFILE,))
+        self.assertCached((GROUP_LIST, ANOTHER_GROUP_LIST), cached=False)
+
+    def test_versions_move_after_commit(self):
+        '''Feed versions move only once the write is committed'''
+        before = feed_versions(INDEX)
+        with on_commit_callbacks():
+            with transaction.atomic():
+                Post.objects.create(text='Свежий пост', author=self.user)
+                self.assertEqual(feed_versions(INDEX), before)
+        self.assertNotEqual(feed_versions(INDEX), before)
+
+    def test_key_ignores_other_parameters(self):
+        '''Only the page number is part of the cache key'''
+        self.warm()
+        self.assertCached((f'{MAIN_PAGE}?page=1&utm=1', f'{MAIN_PAGE}?x=y'))
+        self.guest.get(f'{MAIN_PAGE}?page=999')
+        self.assertCached((f'{MAIN_PAGE}?page=999',), cached=False)
+
+    def test_misses_pin_primary_only_after_bump(self):
+        '''Only misses right after an edit skip the replicas.'''
+        pinned = []
+
+        @cache_feed(lambda: 'some:feed')
+        def view(request):
+            pinned.append(routers.is_pinned())
+            return HttpResponse('Лента')
+
+        routers.reset()
+        self.addCleanup(routers.reset)
+        request = RequestFactory().get('/')
+        view(request)
+        with on_commit_callbacks():
+            invalidate_feeds('some:feed')
+        view(request)
+        view(request)
+        cache.clear()
+        view(request)
+        self.assertEqual(pinned, [False, True, False])
+
+    def test_renamed_author_evicts_feeds(self):
+        '''Renaming an author refreshes feeds and post page ETags'''
+        post_detail = reverse('posts:post_detail', args=[self.post.pk])
+        for url in (MAIN_PAGE, GROUP_LIST, PROFILE):
+            self.guest.get(url)
+        etag = self.guest.get(post_detail)['ETag']
+        author = User.objects.get(pk=self.user.pk)
+        with on_commit_callbacks():
+            author.first_name = 'Переименованный'
+            author.save()
+        for url in (MAIN_PAGE, GROUP_LIST, PROFILE):
+            with self.subTest(url=url):
+                self.assertContains(self.guest.get(url), 'Переименованный')
+        response = self.guest.get(post_detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_keeps_feeds(self):
+        '''Saving last_login alone does not move feed versions'''
+        versions = feed_versions(INDEX)
+        with on_commit_callbacks():
+            self.user.save(update_fields=['last_login'])
+        self.assertEqual(feed_versions(INDEX), versions)
+
+    def test_group_delete_evicts_everything(self):
+        '''Deleting a group evicts every feed'''
+        group = Group.objects.create(
+            title='Удаляемая группа',
+            slug='deleted_slug',
+            description='Тестовое описание',
+        )
+        self.warm()
+        with on_commit_callbacks():
+            group.delete()
+        self.assertCached((MAIN_PAGE, GROUP_LIST, PROFILE), cached=False)
+
+    @override_settings(DEBUG=False)
+    def test_missing_feed_page_has_no_holes(self):
+        '''A 404 from a cached feed view renders its fragments'''
+        author = Client()
+        author.force_login(self.user)
+        for url in (reverse('posts:group_list', args=['missing']),
+                    reverse('posts:profile', args=['missing'])):
+            for client in (self.guest, author):
+                with self.subTest(url=url, client=client):
+                    response = client.get(url)
+                    self.assertContains(response, 'Oh gosh 404',
+                                        status_code=404)
+                    self.assertContains(response, 'navbar', status_code=404)
+                    self.assertNotContains(response, '<!--hole:',
+                                           status_code=404)
+
+    def test_logged_in_readers_share_the_cache(self):
+        '''Logged-in readers get cached pages with their own fragments'''
+        edit_link = reverse('posts:post_edit', args=[self.post.pk])
+        author = Client()
+        author.force_login(self.user)
+        another = Client()
+        another.force_login(self.another_user)
+        self.warm()
+        with CaptureQueriesContext(connection) as queries:
+            response = author.get(MAIN_PAGE)
+        self.assertFalse([
+            query for query in queries
+            if 'posts_post' in query['sql']
+        ])
+        self.assertContains(response, edit_link)
+        self.assertContains(response, 'Выйти')
+        self.assertNotContains(another.get(MAIN_PAGE), edit_link)
+        self.assertNotContains(self.guest.get(MAIN_PAGE), 'Выйти')
+
+
+class FeedCacheCheckTest(SimpleTestCase):
+
+    def test_process_local_cache_warns_on_deploy(self):
+        '''Deploy checks warn while feed versions stay in one process'''
+        self.assertEqual([warning.id for warning in check_feed_cache(None)],
+                         ['posts.W001'])
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_feed_cache(None), [])
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.tests.commit import on_commit_callbacks
+from posts.models import Group, Post, User
+
+MAIN_PAGE = reverse('posts:main_page')
+GROUP_LIST = reverse('posts:group_list', args=['test_slug'])
+PROFILE = reverse('posts:profile', args=['SomeUsername'])
+NOT_MODIFIED = HTTPStatus.NOT_MODIFIED
+OK = HTTPStatus.OK
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+        cls.POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.POST_EDIT = reverse('posts:post_edit', args=[cls.post.pk])
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_are_not_modified(self):
+        '''Unchanged pages answer 304 without touching posts'''
+        for url in (MAIN_PAGE, GROUP_LIST, PROFILE, self.POST_DETAIL):
+            with self.subTest(url=url):
+                etag = self.guest.get(url)['ETag']
+                with self.assertNumQueries(1 if url == self.POST_DETAIL
+                                           else 0):
+                    response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, NOT_MODIFIED)
+
+    def test_post_detail_has_no_last_modified(self):
+        '''Post page is validated by ETag only'''
+        # Число постов автора на странице меняется без правки поста.
+        for client in (self.guest, self.author):
+            with self.subTest(client=client):
+                self.assertFalse(
+                    client.get(self.POST_DETAIL).has_header('Last-Modified')
+                )
+
+    def test_missing_pages_have_no_validators(self):
+        '''Not found answers carry neither ETag nor Last-Modified'''
+        for url in (reverse('posts:api_group', args=['missing']),
+                    reverse('posts:api_post', args=[0]),
+                    reverse('posts:post_detail', args=[0])):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_edit_changes_validators(self):
+        '''Editing a post changes the validators of its pages'''
+        urls = (MAIN_PAGE, GROUP_LIST, PROFILE, self.POST_DETAIL)
+        etags = {url: self.guest.get(url)['ETag'] for url in urls}
+        with on_commit_callbacks():
+            self.author.post(self.POST_EDIT, {
+                'text': 'Измененный пост', 'group': self.group.pk
+            })
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, OK)
+                self.assertContains(response, 'Измененный пост')
+
+    def test_validators_depend_on_reader(self):
+        '''A reader never gets another reader's page as not modified'''
+        for url in (MAIN_PAGE, self.POST_DETAIL):
+            with self.subTest(url=url):
+                etag = self.guest.get(url)['ETag']
+                response = self.author.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, OK)
@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.commit import on_commit_callbacks
+from posts.models import Group, Post, User
+
+INDEX_RSS = reverse('posts:index_rss')
+INDEX_ATOM = reverse('posts:index_atom')
+GROUP_RSS = reverse('posts:group_rss', args=['test_slug'])
+GROUP_ATOM = reverse('posts:group_atom', args=['test_slug'])
+PROFILE_RSS = reverse('posts:profile_rss', args=['SomeUsername'])
+PROFILE_ATOM = reverse('posts:profile_atom', args=['SomeUsername'])
+FEEDS = (
+    (INDEX_RSS, 1), (INDEX_ATOM, 1), (GROUP_RSS, 2), (GROUP_ATOM, 2),
+    (PROFILE_RSS, 2), (PROFILE_ATOM, 2),
+)
+
+
+class SyndicationFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername',
+                                       first_name='Имя', last_name='Автора')
+        cls.another_user = User.objects.create(username='AnotherUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.user, group=cls.group)
+            for i in range(30)
+        )
+        Post.objects.create(text='Чужой пост', author=cls.another_user)
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('posts.feeds.SYNDICATION_ITEMS', 5)
+    def test_feeds(self):
+        '''Feeds list the newest posts of their scope in one query.'''
+        for url, budget in FEEDS:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest.get(url)
+                self.assertEqual(len(queries), budget)
+                content = response.content.decode()
+                self.assertEqual(
+                    content.count('<item>' if 'rss' in url else '<entry>'), 5
+                )
+                self.assertIn('Тестовый пост 29', content)
+                self.assertNotIn('Тестовый пост 24', content)
+                self.assertEqual(
+                    'Чужой пост' in content, url in (INDEX_RSS, INDEX_ATOM)
+                )
+        self.assertIn('rss', self.guest.get(INDEX_RSS)['Content-Type'])
+        self.assertIn('atom', self.guest.get(INDEX_ATOM)['Content-Type'])
+
+    def test_cached_until_next_post(self):
+        '''Feeds are served from cache until a post in their scope.'''
+        for url, _ in FEEDS:
+            self.guest.get(url)
+        for url, _ in FEEDS:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.guest.get(url)
+                self.assertEqual(len(queries), 0)
+        with on_commit_callbacks():
+            Post.objects.create(text='Новый пост', author=self.another_user)
+        self.assertContains(self.guest.get(INDEX_RSS), 'Новый пост')
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(GROUP_RSS)
+        self.assertEqual(len(queries), 0)
+
+    def test_conditional_get(self):
+        '''Feeds answer If-None-Match with 304 Not Modified.'''
+        for url, _ in FEEDS:
+            with self.subTest(url=url):
+                etag = self.guest.get(url)['ETag']
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_last_modified_survives_cache(self):
+        '''Cached feeds keep Last-Modified and answer If-Modified-Since.'''
+        for url, _ in FEEDS:
+            with self.subTest(url=url):
+                last_modified = self.guest.get(url)['Last-Modified']
+                self.assertEqual(self.guest.get(url)['Last-Modified'],
+                                 last_modified)
+                response = self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['Last-Modified'], last_modified)
+
+    def test_holes_are_not_filled(self):
+        '''Feeds have no personal fragments to look for.'''
+        with mock.patch('posts.cache.fill_holes') as fill_holes:
+            for url, _ in FEEDS:
+                self.guest.get(url)
+                self.guest.get(url)
+        fill_holes.assert_not_called()
+
+    def test_missing_scope(self):
+        '''Unknown groups and authors have no feed.'''
+        for name, arg in (('group_rss', 'missing'),
+                          ('profile_atom', 'Missing')):
+            with self.subTest(name=name):
+                response = self.guest.get(
+                    reverse(f'posts:{name}', args=[arg])
+                )
+                self.assertEqual(response.status_code, 404)
+                self.assertNotContains(response, '<!--hole:',
+                                       status_code=404)
+
+    def test_pages_link_feeds(self):
+        '''Feed pages advertise their feeds.'''
+        for page, feed in (
+            (reverse('posts:main_page'), INDEX_ATOM),
+            (reverse('posts:group_list', args=['test_slug']), GROUP_RSS),
+            (reverse('posts:profile', args=['SomeUsername']), PROFILE_ATOM),
+        ):
+            with self.subTest(page=page):
+                self.assertContains(self.guest.get(page), f'href="{feed}"')
@@ -0,0 +1,184 @@
+from unittest import mock, skipUnless
+
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.jobs import work_off
+
+from posts.models import AuthorStats, Follow, Post, TimelineEntry, User
+
+FOLLOW_INDEX = reverse('posts:follow_index')
+FOLLOW = reverse('posts:profile_follow', args=['SomeAuthor'])
+UNFOLLOW = reverse('posts:profile_unfollow', args=['SomeAuthor'])
+PROFILE = reverse('posts:profile', args=['SomeAuthor'])
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='SomeAuthor')
+        cls.reader = User.objects.create(username='SomeReader')
+        cls.stranger = User.objects.create(username='SomeStranger')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.stranger_client = Client()
+        self.stranger_client.force_login(self.stranger)
+
+    def feed(self, client):
+        work_off()
+        return list(client.get(FOLLOW_INDEX).context['page_obj'])
+
+    def followers(self):
+        return AuthorStats.objects.get(author=self.author).followers_count
+
+    def test_follow_and_unfollow(self):
+        '''Following backfills the timeline, unfollowing empties it.'''
+        response = self.reader_client.get(FOLLOW)
+        self.assertRedirects(response, PROFILE)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(self.followers(), 1)
+        self.assertEqual(self.feed(self.reader_client), [self.old_post])
+        self.reader_client.get(FOLLOW)
+        self.assertEqual(self.followers(), 1)
+        self.reader_client.get(UNFOLLOW)
+        self.assertFalse(Follow.objects.filter(user=self.reader))
+        self.assertEqual(self.followers(), 0)
+        self.assertEqual(self.feed(self.reader_client), [])
+
+    def test_cannot_follow_self(self):
+        '''An author cannot follow themselves.'''
+        client = Client()
+        client.force_login(self.author)
+        client.get(FOLLOW)
+        self.assertFalse(Follow.objects.filter(user=self.author))
+
+    def test_new_post_fans_out_to_followers_only(self):
+        '''A new post lands in followers' timelines and nowhere else.'''
+        self.reader_client.get(FOLLOW)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(self.reader_client),
+                         [post, self.old_post])
+        self.assertEqual(self.feed(self.stranger_client), [])
+        post.delete()
+        self.assertEqual(self.feed(self.reader_client), [self.old_post])
+
+    def test_follow_button(self):
+        '''The profile shows the follow button matching the state.'''
+        self.assertContains(self.reader_client.get(PROFILE), FOLLOW)
+        self.reader_client.get(FOLLOW)
+        self.assertContains(self.reader_client.get(PROFILE), UNFOLLOW)
+        self.assertNotContains(Client().get(PROFILE), FOLLOW)
+
+    @mock.patch('posts.timeline.FANOUT_FOLLOWER_LIMIT', 2)
+    def test_popular_author_posts_are_pulled(self):
+        '''Posts of authors over the limit are merged in on read.'''
+        other = User.objects.create(username='SomeOtherAuthor')
+        Follow.objects.create(user=self.reader, author=other)
+        Follow.objects.create(user=self.reader, author=self.author)
+        early = Post.objects.create(text='Обычный автор', author=other)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        popular = Post.objects.create(text='Популярный автор',
+                                      author=self.author)
+        late = Post.objects.create(text='Снова обычный', author=other)
+        self.assertFalse(TimelineEntry.objects.filter(post=popular))
+        self.assertEqual(
+            self.feed(self.reader_client),
+            [late, popular, early, self.old_post]
+        )
+        self.assertEqual(self.feed(self.stranger_client),
+                         [popular, self.old_post])
+
+    @mock.patch('posts.views.POSTS_PER_PAGE', 2)
+    @mock.patch('posts.timeline.FANOUT_FOLLOWER_LIMIT', 2)
+    def test_cursor_walks_merged_timeline(self):
+        '''Cursors page through fanned-out and pulled posts both ways.'''
+        other = User.objects.create(username='SomeOtherAuthor')
+        Follow.objects.create(user=self.reader, author=other)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        posts = [self.old_post]
+        for i in range(4):
+            posts.append(Post.objects.create(
+                text=f'Пост {i}', author=(other, self.author)[i % 2]
+            ))
+        posts.reverse()
+        work_off()
+        pages, cursor = [], ''
+        while cursor is not None:
+            page = self.reader_client.get(
+                FOLLOW_INDEX, {'cursor': cursor}
+            ).context['page_obj']
+            pages.append(list(page))
+            cursor = page.next_cursor
+        self.assertEqual(pages, [posts[:2], posts[2:4], posts[4:]])
+        previous = self.reader_client.get(
+            FOLLOW_INDEX, {'cursor': page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous), posts[2:4])
+
+    @mock.patch('posts.timeline.FANOUT_FOLLOWER_LIMIT', 2)
+    def test_timelines_refill_below_limit(self):
+        '''Posts pulled over the limit are fanned out once it drops.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(text='Популярный автор',
+                                   author=self.author)
+        work_off()
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.stranger_client.get(UNFOLLOW)
+        work_off()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post)
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.stranger))
+        self.assertEqual(self.feed(self.reader_client),
+                         [post, self.old_post])
+
+    def test_concurrent_follow_redirects(self):
+        '''A follow lost to a concurrent duplicate still redirects.'''
+        with mock.patch.object(Follow.objects, 'get_or_create',
+                               side_effect=IntegrityError):
+            response = self.reader_client.get(FOLLOW)
+        self.assertRedirects(response, PROFILE)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class TimelineQueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='SomeReader')
+        for i in range(5):
+            author = User.objects.create(username=f'SomeAuthor{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            for j in range(5):
+                Post.objects.create(text=f'Пост {j}', author=author)
+        work_off()
+
+    def test_timeline_is_one_range_scan(self):
+        '''A timeline page is one query ranging over timeline_feed_idx.'''
+        client = Client()
+        client.force_login(self.reader)
+        cursor = client.get(FOLLOW_INDEX).context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(FOLLOW_INDEX, {'cursor': cursor})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        pages = [query['sql'] for query in queries
+                 if 'FROM "posts_timelineentry"' in query['sql']
+                 and 'LIMIT' in query['sql']]
+        self.assertEqual(len(pages), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {pages[0]}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertIn('timeline_feed_idx', plan[0])
+        self.assertFalse([step for step in plan if 'TEMP B-TREE' in step],
+                         plan)
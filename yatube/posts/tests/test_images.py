@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.db.models.sql.compiler import SQLInsertCompiler
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.jobs import work_off
+from core.tests.commit import on_commit_callbacks
+from posts.models import Post, User
+from posts.thumbnails import thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+MAIN_PAGE = reverse('posts:main_page')
+POST_CREATE = reverse('posts:post_create')
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def create_post(self):
+        self.author.post(POST_CREATE, {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF,
+                                        content_type='image/gif'),
+        })
+        return Post.objects.get()
+
+    def test_upload(self):
+        '''An uploaded image is saved with the post.'''
+        post = self.create_post()
+        self.assertRegex(post.image.name, r'^posts/small.*\.gif$')
+        with post.image.open() as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+
+    @mock.patch('core.db.SQLITE_LOCKED_DELAY', 0)
+    def test_locked_save_keeps_uploaded_image(self):
+        '''A retried insert reuses the image stored by the first attempt.'''
+        insert = SQLInsertCompiler.execute_sql
+        failures = []
+
+        def locked_once(compiler, *args, **kwargs):
+            if compiler.query.model is Post and not failures:
+                failures.append(compiler)
+                raise OperationalError('database is locked')
+            return insert(compiler, *args, **kwargs)
+
+        save = FileSystemStorage.save
+        with mock.patch.object(SQLInsertCompiler, 'execute_sql',
+                               locked_once), \
+                mock.patch.object(FileSystemStorage, 'save', autospec=True,
+                                  side_effect=save) as stored, \
+                mock.patch('core.db.connection') as connection:
+            # Тест идёт внутри транзакции TestCase, где повтора нет.
+            connection.in_atomic_block = False
+            post = self.create_post()
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(stored.call_count, 1)
+        with post.image.open() as file:
+            self.assertEqual(file.read(), SMALL_GIF)
+
+    def test_thumbnails_are_made_by_worker(self):
+        '''Pages show the original until the worker makes thumbnails.'''
+        post = self.create_post()
+        self.assertIsNone(thumbnail(post.image, 'feed'))
+        self.assertContains(self.author.get(MAIN_PAGE), post.image.url)
+        with on_commit_callbacks():
+            work_off()
+        feed = thumbnail(post.image, 'feed')
+        self.assertEqual((feed.width, feed.height), (960, 339))
+        # Для страницы поста маленькая картинка не растягивается.
+        self.assertEqual(thumbnail(post.image, 'detail').width, 2)
+        response = self.author.get(MAIN_PAGE)
+        self.assertContains(response, feed.url)
+        self.assertNotContains(response, post.image.url)
+
+    def test_feed_does_not_open_images(self):
+        '''Rendering a feed with ready thumbnails reads no image files.'''
+        self.create_post()
+        work_off()
+        cache.clear()
+        # Метаданные sorl должны пережить очистку кеша: они есть и в базе.
+        with mock.patch.object(Image, 'open') as image_open, \
+                mock.patch('django.core.files.storage.FileSystemStorage.'
+                           'exists') as exists:
+            response = self.author.get(MAIN_PAGE)
+        self.assertEqual(response.status_code, 200)
+        image_open.assert_not_called()
+        exists.assert_not_called()
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import AuthorStats, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -47,3 +50,121 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     Post._meta.get_field(field).verbose_name, expected_value
                 )
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='Test description',
+        )
+        cls.another_group = Group.objects.create(
+            title='Another group',
+            slug='another_slug',
+            description='Test description',
+        )
+
+    def assertCounters(self, author, group, another_group):
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, author
+        )
+        self.group.refresh_from_db()
+        self.another_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.another_group.posts_count, another_group)
+
+    def test_counters_follow_posts(self):
+        '''Counters follow creating, moving and deleting posts'''
+        post = Post.objects.create(
+            author=self.user, text='Test post', group=self.group
+        )
+        Post.objects.create(author=self.user, text='Test post')
+        self.assertCounters(2, 1, 0)
+        post.group = self.another_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Test post', group=self.group)
+            for _ in range(3)
+        )
+        self.assertCounters(4, 3, 0)
+
+    def test_counters_follow_author_change(self):
+        '''Moving a post to another author moves it between counters'''
+        other = User.objects.create_user(username='other')
+        post = Post.objects.create(author=self.user, text='Test post')
+        post.author = other
+        post.save()
+        self.assertCounters(0, 0, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(author=other).posts_count, 1
+        )
+
+    def test_stale_counters_do_not_block_delete(self):
+        '''Counters drifted below the table stop at zero on delete'''
+        post = Post.objects.create(
+            author=self.user, text='Test post', group=self.group
+        )
+        Post.objects.filter(pk=post.pk).update(group=self.another_group)
+        AuthorStats.objects.update(posts_count=0)
+        # Удаление вычитает из группы, что осталась у объекта в памяти.
+        post.delete()
+        self.assertCounters(0, 0, 0)
+        self.user.delete()
+
+    def test_rebuild_post_counters(self):
+        '''Command rebuilds counters from the posts table'''
+        Post.objects.create(
+            author=self.user, text='Test post', group=self.group
+        )
+        AuthorStats.objects.update(posts_count=100)
+        Group.objects.update(posts_count=100)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+
+class PostHtmlTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_html_is_rendered_on_save(self):
+        '''Saving a post stores its escaped HTML'''
+        post = Post.objects.create(author=self.user,
+                                   text='<b>Первый</b>\nабзац\n\nВторой')
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).text_html,
+            '<p>&lt;b&gt;Первый&lt;/b&gt;<br>абзац</p>\n\n<p>Второй</p>'
+        )
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        self.assertEqual(Post.objects.get(pk=post.pk).text_html,
+                         '<p>Новый текст</p>')
+
+    def test_bulk_create_renders_html(self):
+        '''bulk_create fills the HTML as well'''
+        Post.objects.bulk_create([Post(author=self.user, text='Текст')])
+        self.assertEqual(Post.objects.get().text_html, '<p>Текст</p>')
+
+    def test_render_post_html(self):
+        '''Command fills the HTML of posts saved without it'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(5)
+        )
+        ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+        Post.objects.filter(pk__in=list(ids[:3])).update(text_html='')
+        self.assertEqual(Post.objects.get(pk=ids[0]).html, '<p>Пост 0</p>')
+        output = StringIO()
+        call_command('render_post_html', batch_size=2, stdout=output)
+        self.assertIn('Постов: 3', output.getvalue())
+        self.assertFalse(Post.objects.filter(text_html='').exists())
+        call_command('render_post_html', all=True, stdout=output)
+        self.assertIn('Постов: 5', output.getvalue())
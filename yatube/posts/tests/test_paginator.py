@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Post, User
+from posts.paginator import FeedPaginator, page_window
+
+
+class PageWindowTest(TestCase):
+
+    def test_page_window(self):
+        '''Navigation shows ends, neighbours and ellipses only'''
+        cases = (
+            (1, 3, [1, 2, 3]),
+            (1, 10000, [1, 2, 3, None, 10000]),
+            (50, 10000, [1, None, 48, 49, 50, 51, 52, None, 10000]),
+            (10000, 10000, [1, None, 9998, 9999, 10000]),
+            (5, 100, [1, 2, 3, 4, 5, 6, 7, None, 100]),
+        )
+        for number, num_pages, expected in cases:
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(page_window(number, num_pages), expected)
+
+
+class FeedPaginatorCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый псто {i}', author=cls.user)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_known_count_skips_count_query(self):
+        '''A known count replaces COUNT(*)'''
+        paginator = FeedPaginator(Post.objects.all(), 10, count=25)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(paginator.get_page(3)), 5)
+
+    def test_estimated_count_is_cached(self):
+        '''Estimated mode counts once per query and timeout'''
+        with self.assertNumQueries(1):
+            FeedPaginator(Post.objects.all(), 10, estimate=True).count
+        Post.objects.create(text='Новый пост', author=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                FeedPaginator(Post.objects.all(), 10, estimate=True).count,
+                25
+            )
+
+    def test_prefetched_page(self):
+        '''Rows fetched before the count are reused by the page'''
+        paginator = FeedPaginator(Post.objects.order_by('pk'), 10, count=25)
+        paginator.prefetch('3')
+        with self.assertNumQueries(0):
+            page = paginator.get_page(3)
+        self.assertEqual(len(page), 5)
+        self.assertEqual(page.number, 3)
+
+    def test_prefetched_page_out_of_range(self):
+        '''A page past the end is fetched again as the last page'''
+        paginator = FeedPaginator(Post.objects.all(), 10, count=25)
+        paginator.prefetch('7')
+        with self.assertNumQueries(1):
+            page = paginator.get_page(7)
+            self.assertEqual((page.number, len(page)), (3, 5))
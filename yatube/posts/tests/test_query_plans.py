@@ -0,0 +1,73 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+MAIN_PAGE = reverse('posts:main_page')
+GROUP_LIST = reverse('posts:group_list', args=['test_slug'])
+PROFILE = reverse('posts:profile', args=['SomeUsername'])
+
+# Полный проход по таблице, без индекса; старые SQLite пишут SCAN TABLE.
+TABLE_SCAN = re.compile(r'\bSCAN (TABLE )?posts_post\b(?! USING)')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class FeedQueryPlanTest(TestCase):
+    '''Feed queries are served by indexes, never by a full-table sort'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый псто {i}', author=cls.user, group=cls.group)
+            for i in range(25)
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(url)
+        return [
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_feeds_use_indexes(self):
+        urls = []
+        for url, index in ((MAIN_PAGE, 'post_feed_idx'),
+                           (GROUP_LIST, 'post_group_feed_idx'),
+                           (PROFILE, 'post_author_feed_idx')):
+            cursor = self.guest.get(
+                f'{url}?cursor='
+            ).context['page_obj'].next_cursor
+            urls += [(url, index), (f'{url}?page=2', index),
+                     (f'{url}?cursor={cursor}', index)]
+        for url, index in urls:
+            for sql in self.feed_queries(url):
+                plan = '\n'.join(self.explain(sql))
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertNotRegex(plan, TABLE_SCAN)
+                    if 'ORDER BY' in sql:
+                        self.assertRegex(
+                            plan, rf'posts_post USING INDEX {index}\b'
+                        )
@@ -0,0 +1,181 @@
+import sqlite3
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.admin.sites import site
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core.jobs import work_off
+
+from posts import search
+from posts.models import Post, User
+from posts.search import (
+    Fts5Backend, InvertedIndexBackend, SearchResults, fts5_available
+)
+
+SEARCH = reverse('posts:search')
+
+
+def sqlite_has_fts5():
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE probe USING fts5(text)'
+        )
+    except sqlite3.OperationalError:
+        return False
+    return connection.vendor == 'sqlite'
+
+
+class SearchBackendMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.relevant = Post.objects.create(
+            text='Котики котики и ещё раз котики', author=cls.user
+        )
+        cls.less_relevant = Post.objects.create(
+            text='Длинный рассказ про собак, в котором есть котики, '
+                 'попугаи, хомяки, рыбки и прочая домашняя живность',
+            author=cls.user,
+        )
+        cls.other = Post.objects.create(text='Про собак', author=cls.user)
+        work_off()
+
+    def test_ranked_by_relevance(self):
+        '''Results are ordered by relevance.'''
+        results = SearchResults('котики', self.get_backend())
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(
+            list(results[0:10]), [self.relevant, self.less_relevant]
+        )
+
+    def test_all_terms_required(self):
+        '''Every word of the query must be present in the post.'''
+        results = SearchResults('котики собак', self.get_backend())
+        self.assertEqual(list(results[0:10]), [self.less_relevant])
+
+    def test_query_syntax_is_not_interpreted(self):
+        '''Operators and quotes in the query are plain words.'''
+        for query in ('"котики', 'котики OR собак', 'NOT*', ''):
+            with self.subTest(query=query):
+                results = SearchResults(query, self.get_backend())
+                self.assertEqual(len(results[0:10]), results.count())
+
+    def test_index_follows_edits_and_deletes(self):
+        '''Saving and deleting posts keeps the index in sync.'''
+        backend = self.get_backend()
+        backend.rebuild()
+        post = Post.objects.create(text='Про енотов', author=self.user)
+        work_off()
+        self.assertEqual(SearchResults('енотов', backend).count(), 1)
+        post.text = 'Про барсуков'
+        post.save()
+        work_off()
+        self.assertEqual(SearchResults('енотов', backend).count(), 0)
+        self.assertEqual(SearchResults('барсуков', backend).count(), 1)
+        post.delete()
+        work_off()
+        self.assertEqual(SearchResults('барсуков', backend).count(), 0)
+
+    def test_filter_queryset(self):
+        '''filter() narrows an arbitrary queryset to matching posts.'''
+        self.assertQuerysetEqual(
+            self.get_backend().filter(Post.objects.order_by('pk'), 'собак'),
+            [self.less_relevant.pk, self.other.pk],
+            transform=lambda post: post.pk,
+        )
+
+
+@skipUnless(sqlite_has_fts5(), 'SQLite собран без FTS5')
+class Fts5SearchTest(SearchBackendMixin, TestCase):
+    def get_backend(self):
+        return Fts5Backend()
+
+
+class InvertedIndexSearchTest(SearchBackendMixin, TestCase):
+    def setUp(self):
+        self.backend = InvertedIndexBackend()
+        if not fts5_available():
+            # Сигналы обновляют общий индекс процесса: подменяем его.
+            self.original = search._fallback
+            search._fallback = self.backend
+            self.addCleanup(setattr, search, '_fallback', self.original)
+
+    def get_backend(self):
+        return self.backend
+
+    def test_total_length_follows_edits(self):
+        '''The running total of document lengths matches the documents.'''
+        backend = self.get_backend()
+        backend.rebuild()
+        backend.index(self.other.pk, 'Про собак и кошек')
+        backend.remove(self.relevant.pk)
+        self.assertEqual(backend.total_length, sum(backend.lengths.values()))
+
+    def test_index_follows_edits_and_deletes(self):
+        if fts5_available():
+            self.skipTest('Сигналы обновляют индекс FTS5')
+        super().test_index_follows_edits_and_deletes()
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        Post.objects.bulk_create(
+            Post(text=f'Котики номер {i}', author=cls.user)
+            for i in range(13)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        cls.guest = Client()
+
+    def test_paginated_results(self):
+        '''Search results are paginated and keep the query in links.'''
+        response = self.guest.get(SEARCH, {'q': 'котики'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA'
+                                      '%D0%B8&amp;page=2')
+        response = self.guest.get(SEARCH, {'q': 'котики', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_empty_query(self):
+        '''Without a query the page shows only the form.'''
+        response = self.guest.get(SEARCH)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        '''Admin changelist search goes through the search backend.'''
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'номер 7'
+        )
+        self.assertFalse(distinct)
+        self.assertEqual(
+            list(queryset.values_list('text', flat=True)), ['Котики номер 7']
+        )
+
+    def test_admin_warns_about_truncated_fallback(self):
+        '''Admin says when the in-memory index cut the results short.'''
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        request._messages = CookieStorage(request)
+        backend = InvertedIndexBackend()
+        with mock.patch('posts.admin.get_backend', return_value=backend), \
+                mock.patch('posts.admin.SEARCH_FALLBACK_LIMIT', 5), \
+                mock.patch('posts.search.SEARCH_FALLBACK_LIMIT', 5):
+            queryset, _ = admin.get_search_results(
+                request, Post.objects.all(), 'котики'
+            )
+            self.assertEqual(queryset.count(), 5)
+        self.assertIn('Найдено 13 постов, показаны 5',
+                      [str(message) for message in request._messages][0])
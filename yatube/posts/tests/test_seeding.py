@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from posts.models import AuthorStats, Group, Post, User
+from posts.seeding import START
+
+
+class SeedYatubeTest(TestCase):
+
+    def seed(self, prefix, seed=0):
+        call_command(
+            'seed_yatube', users=5, groups=3, posts=120, batch_size=50,
+            seed=seed, prefix=prefix, stdout=StringIO()
+        )
+        return list(Post.objects.filter(
+            author__username__startswith=prefix
+        ).order_by('pub_date').values_list(
+            'text', 'author__username', 'group__title', 'pub_date'
+        ))
+
+    def test_seed_yatube(self):
+        '''Command creates the requested rows with correct counters'''
+        self.seed('first')
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        authors = AuthorStats.objects.annotate(total=Count('author__posts'))
+        for stats in authors:
+            with self.subTest(author=stats.author_id):
+                self.assertEqual(stats.posts_count, stats.total)
+        for group in Group.objects.annotate(total=Count('posts')):
+            with self.subTest(group=group.slug):
+                self.assertEqual(group.posts_count, group.total)
+
+    def test_seed_is_deterministic(self):
+        '''Same seed gives the same data'''
+        first = self.seed('first')
+        second = self.seed('second')
+        self.assertEqual(
+            [(text, date) for text, _, _, date in first],
+            [(text, date) for text, _, _, date in second],
+        )
+        self.assertEqual(
+            [author[len('first'):] for _, author, _, _ in first],
+            [author[len('second'):] for _, author, _, _ in second],
+        )
+        self.assertNotEqual(first, self.seed('third', seed=1))
+
+    def test_dates_are_kept(self):
+        '''Posts get the generated dates, not the time of the insert'''
+        dates = [date for _, _, _, date in self.seed('first')]
+        self.assertEqual(dates[0], START)
+        self.assertEqual(
+            Post.objects.order_by('pub_date').values_list(
+                'edited', flat=True
+            ).first(),
+            START,
+        )
+
+    def test_rerun_is_idempotent(self):
+        '''Seeding again with the same prefix adds nothing'''
+        first = self.seed('first')
+        self.assertEqual(self.seed('first'), first)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 3)
+
+    def test_other_users_are_not_authors(self):
+        '''Users that merely share the prefix get no seeded posts'''
+        stranger = User.objects.create(username='first_stranger')
+        self.seed('first')
+        self.assertFalse(stranger.posts.exists())
+
+    def test_posts_need_authors(self):
+        '''Posts without users are rejected instead of crashing'''
+        with self.assertRaises(CommandError):
+            call_command('seed_yatube', users=0, posts=10,
+                         stdout=StringIO())
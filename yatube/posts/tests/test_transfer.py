@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import AuthorStats, Group, Post, User
+from posts.search import SearchResults
+from posts.transfer import Checkpoint, export_posts, import_posts
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(calls):
+    def progress(done):
+        progress.calls += 1
+        if progress.calls == calls:
+            raise Interrupted
+    progress.calls = 0
+    return progress
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername',
+                                       first_name='Имя', email='a@b.c')
+        cls.another_user = User.objects.create(username='AnotherUsername')
+        User.objects.create(username='SilentUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Описание, "в кавычках"\nи с переводом строки',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i},\n"многострочный"',
+                author=cls.user if i % 3 else cls.another_user,
+                group=cls.group if i % 2 else None,
+            )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def snapshot(self):
+        return (
+            list(User.objects.filter(posts__isnull=False).distinct().order_by(
+                'username'
+            ).values_list('username', 'first_name', 'last_name', 'email')),
+            list(Group.objects.order_by('slug').values_list(
+                'slug', 'title', 'description'
+            )),
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'edited', 'author__username',
+                'group__slug'
+            )),
+        )
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        '''Export then import into an empty database restores the data.'''
+        for name in ('posts.ndjson', 'posts.csv'):
+            with self.subTest(name=name):
+                before = self.snapshot()
+                path = self.path(name)
+                call_command('export_posts', path, stdout=StringIO())
+                self.wipe()
+                call_command('import_posts', path, stdout=StringIO())
+                self.assertEqual(self.snapshot(), before)
+                self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        self.assertEqual(
+            AuthorStats.objects.get(author__username='SomeUsername')
+            .posts_count, 16
+        )
+        self.assertEqual(Group.objects.get().posts_count, 12)
+        self.assertEqual(SearchResults('многострочный').count(), 25)
+        self.assertFalse(User.objects.get(
+            username='SomeUsername'
+        ).has_usable_password())
+
+    def test_import_is_idempotent(self):
+        '''Importing into a database that has the rows adds nothing.'''
+        before = self.snapshot()
+        path = self.path('posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertEqual(self.snapshot(), before)
+        self.assertIn('Пропущено уже загруженных записей: 28',
+                      out.getvalue())
+
+    def test_conflicts_stop_import(self):
+        '''Keys taken by different rows fail instead of being merged.'''
+        path = self.path('posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        post = Post.objects.order_by('pk').last()
+        changes = (
+            (User.objects.filter(username='SomeUsername'),
+             {'email': 'other@b.c'},
+             'Авторы с другими данными уже в базе: SomeUsername'),
+            (Post.objects.filter(pk=post.pk), {'text': 'Другой'},
+             f'Посты с другими данными уже в базе: {post.pk}'),
+        )
+        for rows, change, message in changes:
+            with self.subTest(message=message):
+                self.wipe()
+                call_command('import_posts', path, stdout=StringIO())
+                rows.update(**change)
+                before = self.snapshot()
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command('import_posts', path, stdout=StringIO())
+                self.assertEqual(self.snapshot(), before)
+
+    def test_failed_import_rebuilds_counters(self):
+        '''Batches committed before a failure get counters and search.'''
+        path = self.path('posts.ndjson')
+        call_command('export_posts', path, stdout=StringIO())
+        last = Post.objects.order_by('pk').last().pk
+        self.wipe()
+        Post.objects.create(
+            id=last, text='Чужой', author=User.objects.create(username='x')
+        )
+        with self.assertRaisesMessage(CommandError, str(last)):
+            call_command('import_posts', path, batch_size=10,
+                         stdout=StringIO())
+        imported = Post.objects.exclude(pk=last)
+        self.assertTrue(imported.exists())
+        group = Group.objects.get()
+        self.assertEqual(group.posts_count,
+                         imported.filter(group=group).count())
+        for author in User.objects.filter(posts__isnull=False).distinct():
+            self.assertEqual(AuthorStats.objects.get(author=author)
+                             .posts_count, author.posts.count())
+        self.assertEqual(SearchResults('многострочный').count(),
+                         imported.count())
+        Post.objects.filter(group=group).delete()
+
+    def test_missing_group_fails(self):
+        '''A post of a group that is not in the file is not imported.'''
+        path = self.path('posts.ndjson')
+        with open(path, 'w') as file:
+            for record in (
+                {'type': 'author', 'username': 'NewAuthor',
+                 'first_name': '', 'last_name': '', 'email': ''},
+                {'type': 'post', 'id': 1000, 'text': 'Пост',
+                 'pub_date': '2020-01-01T00:00:00+00:00',
+                 'edited': '2020-01-01T00:00:00+00:00',
+                 'author': 'NewAuthor', 'group': 'missing'},
+            ):
+                file.write(json.dumps(record) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Нет групп: missing'):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=1000).exists())
+
+    def test_export_resumes(self):
+        '''An interrupted export resumes to the same file.'''
+        for format in ('ndjson', 'csv'):
+            with self.subTest(format=format):
+                full = self.path(f'full.{format}')
+                export_posts(full, format, Checkpoint(f'{full}.cp'),
+                             batch_size=7)
+                path = self.path(f'partial.{format}')
+                checkpoint = Checkpoint(f'{path}.cp')
+                with self.assertRaises(Interrupted):
+                    export_posts(path, format, checkpoint, batch_size=7,
+                                 progress=interrupt_after(2))
+                with open(path, 'a') as file:
+                    file.write('{"type": "post", "обрыв')
+                records = export_posts(path, format, checkpoint,
+                                       batch_size=7, resume=True)
+                self.assertEqual(records, 2 + 1 + 25)
+                with open(full) as expected, open(path) as resumed:
+                    self.assertEqual(resumed.read(), expected.read())
+
+    def test_import_resumes(self):
+        '''An interrupted import resumes without duplicates.'''
+        before = self.snapshot()
+        path = self.path('posts.ndjson')
+        export_posts(path, 'ndjson', Checkpoint(f'{path}.export'))
+        self.wipe()
+        checkpoint = Checkpoint(f'{path}.cp')
+        with self.assertRaises(Interrupted):
+            import_posts(path, 'ndjson', checkpoint, batch_size=5,
+                         progress=interrupt_after(2))
+        self.assertEqual(checkpoint.load(), {'records': 10, 'skipped': 0})
+        import_posts(path, 'ndjson', checkpoint, batch_size=5, resume=True)
+        self.assertEqual(self.snapshot(), before)
+        self.assertIsNone(checkpoint.load())
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 from http.client import NOT_FOUND
 
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 
@@ -45,6 +46,9 @@ class PostURLTests(TestCase):
         cls.another = Client()
         cls.another.force_login(cls.another_user)
 
+    def setUp(self):
+        cache.clear()
+
     def test_URLs(self):
         '''URLs availability test'''
         URLS = (
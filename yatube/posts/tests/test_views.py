@@ -3,10 +3,19 @@ from posts.settings import (
 )
 
 
-from django.test import TestCase, Client
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core import parallel
+from core.parallel import gather
 from posts.models import Post, Group, User
+from posts.paginator import FeedPaginator
 
 
 MAIN_PAGE = reverse('posts:main_page')
@@ -18,6 +27,7 @@ ANOTHER_GROUP_LIST = reverse(
 )
 PROFILE = reverse('posts:profile', args=['SomeUsername'])
 PROFILE_PAGINATOR_SECOND = f'{PROFILE}?page=2'
+MAIN_PAGE_CURSOR = MAIN_PAGE + '?cursor='
 PAGE_START = 0
 PAGE_END = 9
 
@@ -52,6 +62,9 @@ class PostURLTests(TestCase):
         cls.author = Client()
         cls.author.force_login(cls.user)
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_has_correct_context(self):
         '''The page tamplates withs the right context'''
         urls = {
@@ -119,6 +132,9 @@ class PaginatorTest(TestCase):
 
         cls.guest = Client()
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator(self):
         urls = {
             MAIN_PAGE: POSTS_PER_PAGE,
@@ -134,3 +150,155 @@ class PaginatorTest(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']), number
                 )
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый псто {i}', author=cls.user)
+            for i in range(POSTS_PER_PAGE + POSTS_SECOND_PAGE)
+        )
+        cls.newest = list(Post.objects.all()[:POSTS_PER_PAGE])
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_walk(self):
+        '''Cursor links walk the feed forward and back'''
+        first = self.guest.get(MAIN_PAGE_CURSOR).context['page_obj']
+        self.assertEqual(list(first), self.newest)
+        self.assertFalse(first.has_previous())
+        second = self.guest.get(
+            f'{MAIN_PAGE}?cursor={first.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(len(second), POSTS_SECOND_PAGE)
+        self.assertFalse(second.has_next())
+        back = self.guest.get(
+            f'{MAIN_PAGE}?cursor={second.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back), self.newest)
+
+    def test_broken_cursor_is_first_page(self):
+        '''Broken cursor falls back to the first page'''
+        for cursor in ('garbage', '!!!', 'bnx4fDE='):
+            with self.subTest(cursor=cursor):
+                # Битые курсоры делят кеш с первой страницей.
+                cache.clear()
+                page = self.guest.get(
+                    f'{MAIN_PAGE}?cursor={cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(page), self.newest)
+
+    def test_cursor_page_skips_count_and_offset(self):
+        '''Cursor pages neither count rows nor use OFFSET'''
+        first = self.guest.get(MAIN_PAGE_CURSOR).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(f'{MAIN_PAGE}?cursor={first.next_cursor}')
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+
+class FeedQueryBudgetTest(TestCase):
+    '''Feed pages run a fixed number of queries regardless of row count'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='SomeUsername')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_PER_PAGE):
+            author = User.objects.create(username=f'author_{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group_{i}',
+                description='Описание',
+            )
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            Post.objects.create(
+                text=f'Пост в группе {i}', author=cls.user, group=cls.group
+            )
+        cls.post = Post.objects.filter(author=cls.user).first()
+        cls.POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        '''Feeds stay within their query budget'''
+        # Гость заполняет кеш лент, автор получает их из кеша. Сессию и
+        # пользователя автор читает из базы: с LocMemCache они не кешируются.
+        budgets = (
+            (MAIN_PAGE, self.guest, 2),
+            (GROUP_LIST, self.guest, 2),
+            (PROFILE, self.guest, 2),
+            (self.POST_DETAIL, self.guest, 2),
+            (MAIN_PAGE, self.author, 2),
+            (GROUP_LIST, self.author, 2),
+            (PROFILE, self.author, 2),
+            (self.POST_DETAIL, self.author, 4),
+        )
+        for url, client, queries in budgets:
+            with self.subTest(url=url, client=client):
+                with self.assertNumQueries(queries):
+                    client.get(url)
+
+
+class ParallelFeedPageTest(TransactionTestCase):
+    '''TransactionTestCase: pool threads of gather only see committed rows'''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='SomeUsername')
+        self.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(2 * POSTS_PER_PAGE + POSTS_SECOND_PAGE):
+            Post.objects.create(text=f'Тестовый пост {i}', author=self.user,
+                                group=self.group)
+        self.guest = Client()
+
+    def test_feed_pages_through_pool(self):
+        '''Feed pages prefetched in the pool match a plain Paginator'''
+        for url in (MAIN_PAGE, GROUP_LIST, PROFILE):
+            for number in ('1', '3', 'abc', '0', '-1', '999', ''):
+                with self.subTest(url=url, page=number):
+                    # Номера 1, abc и пустой делят кеш первой страницы.
+                    cache.clear()
+                    with mock.patch.object(parallel, '_call',
+                                           wraps=parallel._call) as call:
+                        page = self.guest.get(
+                            url, {'page': number}
+                        ).context['page_obj']
+                    call.assert_called()
+                    expected = Paginator(Post.objects.for_feed(),
+                                         POSTS_PER_PAGE).get_page(number)
+                    self.assertEqual(page.number, expected.number)
+                    self.assertEqual(list(page), list(expected))
+
+    def test_prefetched_last_page_with_orphans(self):
+        '''Orphans join the last page when it is prefetched in the pool'''
+        for number, size in ((1, POSTS_PER_PAGE),
+                             (2, POSTS_PER_PAGE + POSTS_SECOND_PAGE)):
+            with self.subTest(page=number):
+                paginator = FeedPaginator(Post.objects.for_feed(),
+                                          POSTS_PER_PAGE,
+                                          orphans=POSTS_SECOND_PAGE)
+                gather(lambda: paginator.prefetch(number),
+                       lambda: paginator.count)
+                with self.assertNumQueries(0):
+                    page = paginator.get_page(number)
+                self.assertEqual(paginator.num_pages, 2)
+                self.assertEqual(len(page), size)
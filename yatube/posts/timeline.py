@@ -0,0 +1,139 @@
+"""Ленты подписок.
+
+Посты обычных авторов при публикации раскладываются по лентам подписчиков
+(fan-out on write), и страница ленты читается одним диапазоном индекса
+(user, pub_date, post) от курсора. Посты авторов, у которых
+FANOUT_FOLLOWER_LIMIT подписчиков и больше, не раскладываются: одна такая
+публикация стоила бы тысяч вставок. Их посты подмешиваются при чтении по
+индексу автора. Когда автор опускается ниже порога, его последние посты
+снова раскладываются по лентам (refill).
+"""
+import itertools
+from heapq import merge
+
+from core.utils import batched
+from .models import FEED_FIELDS, AuthorStats, Follow, Post, TimelineEntry
+from .paginator import NEXT, CursorPaginator
+from posts.settings import FANOUT_FOLLOWER_LIMIT, TIMELINE_BACKFILL
+
+FANOUT_BATCH = 1000
+
+
+def is_pulled(author_id):
+    """Читают ли посты автора при чтении ленты, а не раскладывают заранее."""
+    return AuthorStats.objects.filter(
+        author_id=author_id, followers_count__gte=FANOUT_FOLLOWER_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    ).iterator(chunk_size=FANOUT_BATCH)
+    for batch in batched(followers, FANOUT_BATCH):
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post.pk,
+                           author_id=post.author_id, pub_date=post.pub_date)
+             for user_id in batch),
+            ignore_conflicts=True,
+        )
+
+
+def latest_posts(author_id):
+    return Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:TIMELINE_BACKFILL]
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if is_pulled(author_id):
+        return
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                       pub_date=pub_date)
+         for post_id, pub_date in latest_posts(author_id)),
+        ignore_conflicts=True,
+    )
+
+
+def dropped_below_limit(author_id):
+    """Опустился ли автор ровно под порог после отписки."""
+    return AuthorStats.objects.filter(
+        author_id=author_id, followers_count=FANOUT_FOLLOWER_LIMIT - 1
+    ).exists()
+
+
+def refill(author_id):
+    """Раскладывает последние посты автора, вернувшегося под порог.
+
+    Пока посты автора подмешивались при чтении, по лентам они не
+    раскладывались; записи, оставшиеся с прошлого раза, не задваиваются.
+    """
+    if is_pulled(author_id):
+        return
+    posts = list(latest_posts(author_id))
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    ).iterator(chunk_size=FANOUT_BATCH)
+    entries = (
+        TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                      pub_date=pub_date)
+        for user_id in followers for post_id, pub_date in posts
+    )
+    for batch in batched(entries, FANOUT_BATCH):
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def drop(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class Timeline:
+    """Записи ленты подписок пользователя и посты популярных авторов."""
+
+    def __init__(self, user):
+        self.pulled = list(Follow.objects.filter(
+            user=user,
+            author__post_stats__followers_count__gte=FANOUT_FOLLOWER_LIMIT,
+        ).values_list('author_id', flat=True))
+        # Записи, разложенные до того, как автор перешёл порог, не должны
+        # задвоиться с подмешанными постами.
+        self.entries = TimelineEntry.objects.filter(user=user).exclude(
+            author_id__in=self.pulled
+        ).select_related('post__author', 'post__group').only(
+            'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+        )
+        self.pulled_posts = Post.objects.for_feed().filter(
+            author_id__in=self.pulled
+        )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Keyset-пагинация ленты подписок по (pub_date, id поста).
+
+    Записи ленты выбираются диапазоном индекса (user, pub_date, post),
+    посты популярных авторов — индексом автора. Обе части отсортированы
+    одинаково, так что для страницы хватает слить их первые строки.
+    """
+
+    def __init__(self, timeline, per_page):
+        super().__init__(timeline.entries, per_page, id_field='post_id')
+        self.pulled = None
+        if timeline.pulled:
+            self.pulled = CursorPaginator(timeline.pulled_posts, per_page)
+
+    def _fetch(self, direction, date, pk):
+        posts = [entry.post for entry in super()._fetch(direction, date, pk)]
+        if self.pulled is None:
+            return posts
+        merged = merge(posts, self.pulled._fetch(direction, date, pk),
+                       key=self._key, reverse=direction == NEXT)
+        return list(itertools.islice(merged, self.per_page + 1))
+
+    def _key(self, row):
+        return row.pub_date, row.pk
@@ -1,51 +1,170 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.db.models import Subquery
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.db import retry_locked
+from core.parallel import gather
+from .cache import (
+    ALL, INDEX, cache_feed, conditional, digest, feed_etag, feed_versions,
+    group_scope, profile_scope
+)
 from .forms import PostForm
-from .models import Group, Post, User
-from posts.settings import POSTS_PER_PAGE
+from .models import AuthorStats, Follow, Group, Post, User
+from .paginator import CursorPaginator, FeedPaginator
+from .search import SearchResults
+from .timeline import Timeline, TimelinePaginator
+from posts.settings import FEED_COUNT_MODE, FEED_PAGINATION, POSTS_PER_PAGE
+
 
+def feed_page(request, posts, lookup=None, count=None):
+    """Объект шапки ленты (группа, автор) и страница её постов.
 
-def paginator_page(request, posts):
-    paginator = Paginator(posts, POSTS_PER_PAGE)
+    Независимые запросы идут одновременно (core.parallel.gather): lookup
+    шапки, строки страницы и, если count не задан, подсчёт постов. count
+    получает результат lookup и берёт число постов из счётчика. Номер
+    страницы проверяется уже после выборки; если он за последней
+    страницей, нужная страница запрашивается отдельно.
+    """
+    lookup = lookup or (lambda: None)
+    cursor = request.GET.get('cursor')
+    if cursor is not None or FEED_PAGINATION == 'cursor':
+        paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+        return gather(lookup, lambda: paginator.get_page(cursor))
+    paginator = FeedPaginator(posts, POSTS_PER_PAGE,
+                              estimate=FEED_COUNT_MODE == 'estimated')
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    functions = [lookup, lambda: paginator.prefetch(page_number)]
+    if count is None:
+        functions.append(lambda: paginator.count)
+    header = gather(*functions)[0]
+    if count is not None:
+        paginator.known_count = count(header)
+    page = paginator.get_page(page_number)
+    # По нему cache_feed узнаёт, какую страницу отдали на самом деле.
+    request.feed_page_number = page.number
+    return header, page
+
+
+def posts_count(author):
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def index_scope():
+    return INDEX
+
+
+def post_validators(request, post_id):
+    """Общий для всех посетителей ETag и дата правки поста одним запросом."""
+    if not hasattr(request, 'post_validators'):
+        edited, username = Post.objects.filter(pk=post_id).values_list(
+            'edited', 'author__username'
+        ).first() or (None, None)
+        request.post_validators = (None, None)
+        if edited is not None:
+            # Страница зависит и от числа постов автора, поэтому в ETag
+            # входит версия его ленты.
+            versions = feed_versions(ALL, profile_scope(username))
+            etag = digest(f'{edited.isoformat()}|{versions}')
+            request.post_validators = (etag, edited)
+    return request.post_validators
 
 
+def post_etag(request, post_id):
+    # Шапка страницы у каждого посетителя своя.
+    etag = post_validators(request, post_id)[0]
+    return etag and digest(f'{etag}|{request.user.pk}')
+
+
+def post_last_modified(request, post_id):
+    return post_validators(request, post_id)[1]
+
+
+@conditional(etag_func=feed_etag(index_scope))
+@cache_feed(index_scope)
 def index(request):
-    return render(request, 'posts/index.html', {
-        'page_obj': paginator_page(request, Post.objects.all()),
-    })
+    _, page_obj = feed_page(request, Post.objects.for_feed())
+    return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
+@conditional(etag_func=feed_etag(group_scope))
+@cache_feed(group_scope)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    # Посты выбираются по подзапросу к slug, не дожидаясь самой группы.
+    group, page_obj = feed_page(
+        request,
+        Post.objects.for_feed().filter(group=Subquery(
+            Group.objects.filter(slug=slug).values('pk')
+        )),
+        lookup=lambda: get_object_or_404(Group, slug=slug),
+        count=lambda group: group.posts_count,
+    )
     return render(request, 'posts/group_list.html',
-                  {'page_obj': paginator_page(request, group.posts.all()),
-                   'group': group})
+                  {'page_obj': page_obj, 'group': group})
 
 
+@conditional(etag_func=feed_etag(profile_scope))
+@cache_feed(profile_scope)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author, page_obj = feed_page(
+        request,
+        Post.objects.for_feed().filter(author=Subquery(
+            User.objects.filter(username=username).values('pk')
+        )),
+        lookup=lambda: get_object_or_404(
+            User.objects.select_related('post_stats'), username=username
+        ),
+        count=posts_count,
+    )
     return render(request, 'posts/profile.html',
-                  {'page_obj': paginator_page(request, author.posts.all()),
-                   'author': author})
+                  {'page_obj': page_obj, 'author': author})
 
 
+# Без Last-Modified: число постов автора на странице меняется, не трогая
+# даты правки поста, и If-Modified-Since получил бы устаревший 304.
+@conditional(etag_func=post_etag)
 def post_detail(request, post_id):
-    return render(request, 'posts/post_detail.html',
-                  {'post': get_object_or_404(Post, id=post_id)})
+    post = get_object_or_404(
+        Post.objects.with_related().select_related('author__post_stats'),
+        id=post_id
+    )
+    return render(request, 'posts/post_detail.html', {'post': post})
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = FeedPaginator(SearchResults(query), POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'query_prefix': urlencode({'q': query}) + '&',
+    })
+
+
+@retry_locked
+def save_post(post):
+    # Повторяется только запись в базу. Загруженный файл картинки
+    # переносится в хранилище при первой попытке, и повтор его уже не
+    # трогает (FieldFile._committed).
+    post.save()
 
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    form.save()
+    save_post(post)
     return redirect('posts:profile', post.author)
 
 
@@ -54,9 +173,39 @@ def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    instance=post)
     if form.is_valid():
-        form.save()
+        save_post(form.save(commit=False))
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', {'form': form,
                   'is_edit': True})
+
+
+@login_required
+def follow_index(request):
+    paginator = TimelinePaginator(Timeline(request.user), POSTS_PER_PAGE)
+    return render(request, 'posts/follow.html', {
+        'page_obj': paginator.get_page(request.GET.get('cursor')),
+    })
+
+
+@login_required
+@retry_locked
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        try:
+            Follow.objects.get_or_create(user=request.user, author=author)
+        except IntegrityError:
+            # Параллельный запрос успел создать ту же подписку.
+            pass
+    return redirect('posts:profile', username)
+
+
+@login_required
+@retry_locked
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect('posts:profile', username)
@@ -0,0 +1,34 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from core.routers import use_primary
+from users.settings import USER_CACHE, USER_CACHE_TIMEOUT
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша.
+
+    AuthenticationMiddleware на каждый запрос вызывает get_user; без кеша
+    это запрос к auth_user ещё до view. Запись сбрасывает сигнал при
+    любом сохранении пользователя (users.signals), в том числе при смене
+    пароля: иначе проверка хеша сессии шла бы по старому паролю. Сброс
+    должен дойти до всех процессов, поэтому USER_CACHE — общий кеш
+    (проверка users.E002).
+    """
+
+    def get_user(self, user_id):
+        cache = caches[USER_CACHE]
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            # Реплика может ещё не знать о смене пароля, а в кеше это
+            # застряло бы на USER_CACHE_TIMEOUT.
+            with use_primary():
+                user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
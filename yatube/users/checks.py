@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from core.utils import is_process_local
+from users.settings import USER_CACHE
+
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+CACHED_BACKEND = 'users.backends.CachedModelBackend'
+HINT = 'Укажите общий для всех процессов кеш, например memcached.'
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """Выход и смена пароля должны доходить до всех процессов."""
+    errors = []
+    if (settings.SESSION_ENGINE in CACHED_SESSION_ENGINES
+            and is_process_local(settings.SESSION_CACHE_ALIAS)):
+        errors.append(Error(
+            'Сессии хранятся в LocMemCache, своём у каждого процесса: '
+            'выход в одном процессе не завершит сессию в остальных.',
+            hint=HINT,
+            id='users.E001',
+        ))
+    if (CACHED_BACKEND in settings.AUTHENTICATION_BACKENDS
+            and is_process_local(USER_CACHE)):
+        errors.append(Error(
+            'USER_CACHE — LocMemCache, свой у каждого процесса: смена '
+            'пароля или блокировка в одном процессе не дойдёт до остальных.',
+            hint=HINT,
+            id='users.E002',
+        ))
+    return errors
@@ -0,0 +1,4 @@
+# Кеш пользователей сессий для AuthenticationMiddleware (users.backends):
+# алиас из CACHES и время жизни записи в секундах.
+USER_CACHE = 'default'
+USER_CACHE_TIMEOUT = 300
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.backends import user_cache_key
+from users.settings import USER_CACHE
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    caches[USER_CACHE].delete(user_cache_key(instance.pk))
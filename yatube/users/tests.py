@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.commands.purge_sessions import (
+    Command as PurgeCommand
+)
+from users.checks import check_shared_caches
+
+User = get_user_model()
+
+MAIN_PAGE = reverse('posts:main_page')
+CACHED_SESSIONS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+}
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    'LOCATION': '127.0.0.1:11211',
+}}
+
+
+# LocMemCache здесь допустим: тест идёт в одном процессе.
+@override_settings(**CACHED_SESSIONS)
+class CachedSessionUserTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             password='old-password')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.get(MAIN_PAGE)
+
+    def test_user_served_from_cache(self):
+        '''A logged-in request reads neither session nor user from the DB.'''
+        with self.assertNumQueries(0):
+            response = self.client.get(MAIN_PAGE)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_saving_user_resets_cache(self):
+        '''A saved user is reloaded on the next request.'''
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response = self.client.get(MAIN_PAGE)
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+
+    def test_password_change_logs_out(self):
+        '''Changing the password ends other sessions despite the cache.'''
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(MAIN_PAGE)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+
+class PurgeSessionsTest(TestCase):
+
+    def test_deletes_only_expired(self):
+        '''Expired sessions are deleted in batches, live ones are kept.'''
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='',
+                    expire_date=now - timedelta(days=1))
+            for i in range(5)
+        )
+        Session.objects.create(session_key='live', session_data='',
+                               expire_date=now + timedelta(days=1))
+        output = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=output)
+        self.assertIn('Удалено сессий: 5', output.getvalue())
+        self.assertQuerysetEqual(
+            Session.objects.all(), ['live'], lambda s: s.session_key
+        )
+
+    def test_batch_fits_query_params(self):
+        '''A batch never binds more keys than the backend allows.'''
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='',
+                    expire_date=timezone.now() - timedelta(days=1))
+            for i in range(5)
+        )
+        delete_batch = mock.patch.object(
+            PurgeCommand, 'delete_batch', autospec=True,
+            side_effect=PurgeCommand.delete_batch,
+        )
+        with mock.patch.object(connection.features, 'max_query_params', 2), \
+                delete_batch as spy:
+            call_command('purge_sessions', stdout=StringIO())
+        self.assertEqual({call.args[1] for call in spy.call_args_list}, {2})
+        self.assertFalse(Session.objects.exists())
+
+    def test_batch_size_must_be_positive(self):
+        '''--batch-size 0 is rejected before anything is deleted.'''
+        with self.assertRaises(CommandError):
+            call_command('purge_sessions', batch_size=0, stdout=StringIO())
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+
+    def test_default_settings_pass(self):
+        '''With LocMemCache sessions and users are not cached.'''
+        self.assertEqual(check_shared_caches(None), [])
+
+    @override_settings(**CACHED_SESSIONS)
+    def test_cached_sessions_need_shared_cache(self):
+        '''Cached sessions and users on LocMemCache fail the checks.'''
+        self.assertEqual(
+            [error.id for error in check_shared_caches(None)],
+            ['users.E001', 'users.E002']
+        )
+        with override_settings(CACHES=SHARED_CACHES):
+            self.assertEqual(check_shared_caches(None), [])
@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own, so the handler comes from
+core.asgi. Run it with any ASGI server, e.g.
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+from core.template.warmup import warm_templates
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_asgi_application()
+# Шаблоны разбираются до первого запроса, а не во время него.
+warm_templates()
@@ -52,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,9 +67,9 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template.backends.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -76,6 +78,15 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year'
             ],
+            # Кешированный загрузчик и при DEBUG: каждый шаблон разбирается
+            # один раз на процесс, а не на каждый {% include %}. После
+            # правки шаблона сервер нужно перезапустить.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -90,9 +101,52 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, и PRAGMA из core.db
+        # выполняются один раз на соединение, а не на каждый запрос.
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Реплики только для чтения — алиасы из DATABASES, например:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+# Копии SQLite обновляет manage.py sync_replicas.
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# LocMemCache свой у каждого процесса: сброс лент из другого процесса или
+# из воркера до него не дойдёт (manage.py check --deploy предупредит).
+# Для нескольких процессов подойдёт файловый кеш:
+# 'django.core.cache.backends.filebased.FileBasedCache' с 'LOCATION'.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube',
     }
 }
 
+# С общим кешем сессии читаются из него, в базу ходят только запись и
+# промах кеша, и пользователь сессии тоже берётся из кеша
+# (users.backends). С LocMemCache выход, смена пароля или блокировка в
+# одном процессе (админка, manage.py changepassword, воркер) не дошли бы
+# до остальных, поэтому остаются сессии в базе и обычный ModelBackend;
+# проверки users.E001 и users.E002 не дают включить их вместе.
+# Совсем без базы — 'django.contrib.sessions.backends.signed_cookies', но
+# тогда выход на сервере не отзывает уже выданную куку.
+if CACHES['default']['BACKEND'] != (
+        'django.core.cache.backends.locmem.LocMemCache'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -134,6 +188,20 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Загрузки пишутся во временный файл кусками, а не собираются в памяти,
+# и FileSystemStorage потом просто переносит файл в MEDIA_ROOT.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Миниатюры готовит воркер (posts.thumbnails); метаданные sorl хранит в
+# таблице и кеше, так что шаблоны файлов не открывают.
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:main_page'
@@ -142,8 +210,16 @@ LOGIN_REDIRECT_URL = 'posts:main_page'
 
 PASSWORD_REST_URL = 'users:password_reset'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь задач, а отправляет их run_worker через
+# EMAIL_DELIVERY_BACKEND (на проде — smtp.EmailBackend).
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# /metrics/ открыт персоналу сайта и сборщику метрик с заголовком
+# «Authorization: Bearer <METRICS_TOKEN>»; None — только персоналу.
+METRICS_TOKEN = None
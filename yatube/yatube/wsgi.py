@@ -11,6 +11,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core.template.warmup import warm_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+# Шаблоны разбираются до первого запроса, а не во время него.
+warm_templates()